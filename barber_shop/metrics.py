@@ -0,0 +1,208 @@
+import time
+from contextvars import ContextVar, Token
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from django.http import HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, float("inf"))
+
+
+class RequestTimings:
+    # Where the time of one request went. The instance lives in a context
+    # variable, so the query wrapper and the calendar client add to the
+    # request they run for, threads of async views included.
+    __slots__ = (
+        "view",
+        "db_queries",
+        "db_seconds",
+        "http_seconds",
+        "render_seconds",
+        "render_start",
+    )
+
+    def __init__(self):
+        self.view = "unresolved"
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.http_seconds = 0.0
+        self.render_seconds = 0.0
+        self.render_start = 0.0
+
+    def server_timing(self, total: float) -> str:
+        return ", ".join(
+            (
+                f"app;dur={total * 1000:.1f}",
+                f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+                f"http;dur={self.http_seconds * 1000:.1f}",
+                f"render;dur={self.render_seconds * 1000:.1f}",
+            )
+        )
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def start_timings() -> Tuple[RequestTimings, Token]:
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop_timings(token: Token) -> None:
+    _current.reset(token)
+
+
+def add_http_time(seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.http_seconds += seconds
+
+
+def time_query(execute, sql, params, many, context):
+    # Installed on every connection (connection.execute_wrappers), costs two
+    # perf_counter() calls per query.
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_queries += 1
+        timings.db_seconds += time.perf_counter() - start
+
+
+def install_query_timer(sender, connection, **kwargs) -> None:
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class ViewMetrics:
+    # Per-process aggregates by view, exposed in the Prometheus text format.
+    _lock = Lock()
+    _views: Dict[str, Dict] = {}
+
+    @classmethod
+    def record(cls, timings: RequestTimings, total: float) -> None:
+        with cls._lock:
+            view = cls._views.get(timings.view)
+            if view is None:
+                view = cls._views[timings.view] = {
+                    "count": 0,
+                    "seconds": 0.0,
+                    "buckets": [0] * len(LATENCY_BUCKETS),
+                    "db_queries": 0,
+                    "db_seconds": 0.0,
+                    "http_seconds": 0.0,
+                    "render_seconds": 0.0,
+                }
+
+            view["count"] += 1
+            view["seconds"] += total
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if total <= bound:
+                    view["buckets"][index] += 1
+            view["db_queries"] += timings.db_queries
+            view["db_seconds"] += timings.db_seconds
+            view["http_seconds"] += timings.http_seconds
+            view["render_seconds"] += timings.render_seconds
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Dict]:
+        with cls._lock:
+            return {
+                name: dict(view, buckets=list(view["buckets"]))
+                for name, view in cls._views.items()
+            }
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._views.clear()
+
+    @classmethod
+    def prometheus(cls) -> str:
+        views = cls.snapshot()
+        lines: List[str] = [
+            "# HELP barber_request_duration_seconds Wall time of the requests.",
+            "# TYPE barber_request_duration_seconds histogram",
+        ]
+        for name, view in views.items():
+            for bound, amount in zip(LATENCY_BUCKETS, view["buckets"]):
+                le = "+Inf" if bound == float("inf") else bound
+                lines.append(
+                    f'barber_request_duration_seconds_bucket{{view="{name}",le="{le}"}} {amount}'
+                )
+            lines.append(
+                f'barber_request_duration_seconds_sum{{view="{name}"}} {view["seconds"]}'
+            )
+            lines.append(
+                f'barber_request_duration_seconds_count{{view="{name}"}} {view["count"]}'
+            )
+
+        counters = (
+            ("db_queries", "barber_request_db_queries_total", "Database queries."),
+            ("db_seconds", "barber_request_db_seconds_total", "Time in the database."),
+            (
+                "http_seconds",
+                "barber_request_http_seconds_total",
+                "Time in outbound HTTP calls (holiday API).",
+            ),
+            (
+                "render_seconds",
+                "barber_request_render_seconds_total",
+                "Time rendering the response body.",
+            ),
+        )
+        for key, metric, description in counters:
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, view in views.items():
+                lines.append(f'{metric}{{view="{name}"}} {view[key]}')
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def calendar(snapshot: Dict) -> str:
+        lines = [
+            "# HELP barber_holiday_api_calls_total Holiday API calls by outcome.",
+            "# TYPE barber_holiday_api_calls_total counter",
+        ]
+        for outcome, amount in snapshot["outcomes"].items():
+            lines.append(
+                f'barber_holiday_api_calls_total{{outcome="{outcome}"}} {amount}'
+            )
+
+        lines += [
+            "# HELP barber_holiday_api_duration_seconds Holiday API attempts.",
+            "# TYPE barber_holiday_api_duration_seconds histogram",
+        ]
+        for bound, amount in snapshot["latency_buckets"]:
+            le = "+Inf" if bound == float("inf") else bound
+            lines.append(
+                f'barber_holiday_api_duration_seconds_bucket{{le="{le}"}} {amount}'
+            )
+        lines.append(
+            f"barber_holiday_api_duration_seconds_sum {snapshot['latency_sum']}"
+        )
+        lines.append(
+            f"barber_holiday_api_duration_seconds_count {snapshot['latency_count']}"
+        )
+
+        return "\n".join(lines) + "\n"
+
+
+def metrics(request):
+    from schedules.calendar_client import CalendarClient
+
+    body = ViewMetrics.prometheus() + ViewMetrics.calendar(
+        CalendarClient.default().metrics.snapshot()
+    )
+    return HttpResponse(body, content_type="text/plain; version=0.0.4")
@@ -0,0 +1,168 @@
+import asyncio
+import time
+
+from django.conf import settings
+
+from barber_shop.metrics import (
+    ViewMetrics,
+    current_timings,
+    start_timings,
+    stop_timings,
+)
+from barber_shop.querylog import QueryInspector
+from barber_shop.routers import ReplicaRouter
+
+
+class ReplicaRoutingMiddleware:
+    # Safe requests read from the replicas. A client that just wrote gets a
+    # cookie pinning its reads to the primary until the replicas caught up,
+    # so it always sees its own bookings and confirmations.
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def reads_from_replica(self, request) -> bool:
+        return (
+            request.method in self.SAFE_METHODS
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+        )
+
+    def pin(self, request, response):
+        if settings.DATABASE_REPLICAS and request.method not in self.SAFE_METHODS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        token = ReplicaRouter.use_replicas(self.reads_from_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            ReplicaRouter.reset(token)
+
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = ReplicaRouter.use_replicas(self.reads_from_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            ReplicaRouter.reset(token)
+
+        return self.pin(request, response)
+
+
+class InstrumentationMiddleware:
+    # Times every request by view: wall time, database queries, holiday API
+    # calls and response rendering. The numbers go out in a Server-Timing
+    # header and are aggregated for /metrics.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    @staticmethod
+    def view_name(request) -> str:
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unresolved"
+        return getattr(match.func, "view_class", match.func).__name__
+
+    def process_template_response(self, request, response):
+        timings = current_timings()
+        if timings is not None:
+            timings.render_start = time.perf_counter()
+            response.add_post_render_callback(self.rendered)
+        return response
+
+    @staticmethod
+    def rendered(response):
+        timings = current_timings()
+        if timings is not None:
+            timings.render_seconds += time.perf_counter() - timings.render_start
+
+    def finish(self, request, response, timings, start):
+        total = time.perf_counter() - start
+        timings.view = self.view_name(request)
+        ViewMetrics.record(timings, total)
+        response["Server-Timing"] = timings.server_timing(total)
+        return response
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        timings, token = start_timings()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_timings(token)
+
+        return self.finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        timings, token = start_timings()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_timings(token)
+
+        return self.finish(request, response, timings, start)
+
+
+class QueryInspectionMiddleware:
+    # Flags repeated and slow queries of each request, see QueryInspector.
+    # Passes requests straight through unless inspection is on.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        if not QueryInspector.enabled():
+            return self.get_response(request)
+
+        queries, token = QueryInspector.start()
+        try:
+            return self.get_response(request)
+        finally:
+            QueryInspector.finish(
+                InstrumentationMiddleware.view_name(request), queries, token
+            )
+
+    async def __acall__(self, request):
+        if not QueryInspector.enabled():
+            return await self.get_response(request)
+
+        queries, token = QueryInspector.start()
+        try:
+            return await self.get_response(request)
+        finally:
+            QueryInspector.finish(
+                InstrumentationMiddleware.view_name(request), queries, token
+            )
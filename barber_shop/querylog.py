@@ -0,0 +1,168 @@
+import logging
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger("barber_shop.queries")
+
+
+def caller_stack() -> str:
+    # The frames of this project that led to the query, without Django's.
+    frames = [
+        frame
+        for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(str(settings.BASE_DIR))
+        and "site-packages" not in frame.filename
+        and not frame.filename.endswith("querylog.py")
+    ]
+    return "".join(traceback.format_list(frames))
+
+
+class RequestQueries:
+    __slots__ = ("total", "seen", "duplicates", "slow")
+
+    def __init__(self):
+        self.total = 0
+        self.seen: Dict[Tuple[str, str], int] = {}
+        self.duplicates: Dict[str, Dict] = {}
+        self.slow: List[Dict] = []
+
+    def record(self, sql: str, params, many: bool, seconds: float) -> None:
+        self.total += 1
+
+        key = (sql, "" if many else repr(params))
+        repeats = self.seen.get(key, 0) + 1
+        self.seen[key] = repeats
+        if repeats > 1:
+            duplicate = self.duplicates.get(sql)
+            if duplicate is None:
+                duplicate = self.duplicates[sql] = {"count": 0, "stack": caller_stack()}
+            duplicate["count"] += 1
+
+        if seconds >= settings.SLOW_QUERY_SECONDS:
+            self.slow.append({"sql": sql, "seconds": seconds, "stack": caller_stack()})
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar(
+    "request_queries", default=None
+)
+
+
+def inspect_query(execute, sql, params, many, context):
+    queries = _current.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.record(sql, params, many, time.perf_counter() - start)
+
+
+def install_query_inspector(sender, connection, **kwargs) -> None:
+    if inspect_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(inspect_query)
+
+
+class QueryReport:
+    # Queries by endpoint: how many ran, which repeated within a request
+    # (count of the extra executions) and which were slow.
+    def __init__(self):
+        self.endpoints: Dict[str, Dict] = {}
+        self._lock = Lock()
+
+    def add(self, view: str, queries: RequestQueries) -> None:
+        with self._lock:
+            endpoint = self.endpoints.setdefault(
+                view, {"requests": 0, "queries": 0, "duplicates": {}, "slow": []}
+            )
+            endpoint["requests"] += 1
+            endpoint["queries"] += queries.total
+            for sql, duplicate in queries.duplicates.items():
+                endpoint["duplicates"][sql] = (
+                    endpoint["duplicates"].get(sql, 0) + duplicate["count"]
+                )
+            endpoint["slow"] += queries.slow
+
+    def duplicates(self, view: str) -> Dict[str, int]:
+        return dict(self.endpoints.get(view, {}).get("duplicates", {}))
+
+    def slow(self, view: str) -> List[Dict]:
+        return list(self.endpoints.get(view, {}).get("slow", []))
+
+    def summary(self) -> str:
+        lines = []
+        for view, endpoint in sorted(self.endpoints.items()):
+            lines.append(
+                f"{view}: {endpoint['requests']} requests, "
+                f"{endpoint['queries'] / endpoint['requests']:.1f} queries/request, "
+                f"{sum(endpoint['duplicates'].values())} duplicates, "
+                f"{len(endpoint['slow'])} slow"
+            )
+            for sql, amount in endpoint["duplicates"].items():
+                lines.append(f"    x{amount} {sql}")
+        return "\n".join(lines)
+
+
+class QueryInspector:
+    # Opt-in with QUERY_INSPECTION=1 (logs only), or for a block of code with
+    # recording(), which also collects a QueryReport:
+    #
+    #     with QueryInspector.recording() as report:
+    #         client.get(url)
+    #     assert not report.duplicates("ScheduleView")
+    _reports: List[QueryReport] = []
+    _lock = Lock()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return settings.QUERY_INSPECTION or bool(cls._reports)
+
+    @classmethod
+    @contextmanager
+    def recording(cls):
+        report = QueryReport()
+        with cls._lock:
+            cls._reports.append(report)
+        try:
+            yield report
+        finally:
+            with cls._lock:
+                cls._reports.remove(report)
+
+    @staticmethod
+    def start() -> Tuple[RequestQueries, Token]:
+        queries = RequestQueries()
+        return queries, _current.set(queries)
+
+    @classmethod
+    def finish(cls, view: str, queries: RequestQueries, token: Token) -> None:
+        _current.reset(token)
+
+        for sql, duplicate in queries.duplicates.items():
+            logger.warning(
+                "%s: query repeated %d times in the request: %s\n%s",
+                view,
+                duplicate["count"] + 1,
+                sql,
+                duplicate["stack"],
+            )
+        for slow in queries.slow:
+            logger.warning(
+                "%s: slow query (%.1f ms): %s\n%s",
+                view,
+                slow["seconds"] * 1000,
+                slow["sql"],
+                slow["stack"],
+            )
+
+        with cls._lock:
+            reports = list(cls._reports)
+        for report in reports:
+            report.add(view, queries)
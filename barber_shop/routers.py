@@ -0,0 +1,43 @@
+import random
+from contextvars import ContextVar, Token
+from typing import Optional
+
+from django.conf import settings
+
+# The replica the reads of the current request go to, None for the primary.
+# Set per request by ReplicaRoutingMiddleware; anything running outside a
+# request (commands, shell, signals of a write) reads from the primary.
+_read_from_replica: ContextVar[Optional[str]] = ContextVar(
+    "read_from_replica", default=None
+)
+
+
+class ReplicaRouter:
+    # Reads of read-only requests go to one of DATABASE_REPLICAS, everything
+    # else (writes, reads of write requests and of clients pinned after a
+    # write) to the primary, "default".
+    @staticmethod
+    def use_replicas(value: bool) -> Token:
+        # One replica for the whole request: replicas lag by different
+        # amounts, switching between them could show data going backwards.
+        replica = None
+        if value and settings.DATABASE_REPLICAS:
+            replica = random.choice(settings.DATABASE_REPLICAS)
+        return _read_from_replica.set(replica)
+
+    @staticmethod
+    def reset(token: Token) -> None:
+        _read_from_replica.reset(token)
+
+    def db_for_read(self, model, **hints):
+        return _read_from_replica.get() or "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -16,8 +16,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from barber_shop.metrics import metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("schedules.urls")),
     path("barber/api/", include("barbers.urls")),
+    path("metrics/", metrics),
 ]
@@ -6,6 +6,7 @@ from barbers.models import Barber
 @admin.register(Barber)
 class BarberAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "phone_number")
+    list_select_related = ("user",)
 
     def get_readonly_fields(self, request, obj):
         if obj:
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("barbers", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="barber",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Atualizado em"),
+        ),
+    ]
@@ -13,6 +13,7 @@ class Barber(models.Model):
         verbose_name="Usuário",
     )
     phone_number = models.CharField(verbose_name="Número de telefone", max_length=20)
+    updated_at = models.DateTimeField(verbose_name="Atualizado em", auto_now=True)
 
     def __str__(self):
         return self.user.first_name
@@ -1,15 +1,48 @@
 import re
+from hashlib import md5
+from typing import Any, Dict
 
 from django.contrib.auth.models import User
+from django.utils import timezone
 from rest_framework.serializers import ModelSerializer, ValidationError
 
 from barbers.models import Barber
 
 
-class BarberSerializer(ModelSerializer):
+class ChangedFieldsUpdateMixin:
+    # Updates write only the columns that changed, and only on the row of the
+    # instance being edited. Relations are never written here: QuerySet.update()
+    # can't set reverse relations and the owner of a row isn't editable.
+    def update(self, instance, validated_data):
+        columns = {
+            field.name
+            for field in instance._meta.concrete_fields
+            if not field.is_relation
+        }
+        changed = {
+            field: value
+            for field, value in validated_data.items()
+            if field in columns and getattr(instance, field) != value
+        }
+
+        self.changed_fields = list(changed)
+
+        if changed:
+            # QuerySet.update() skips auto_now, so it is set here.
+            if any(field.name == "updated_at" for field in instance._meta.fields):
+                changed["updated_at"] = timezone.now()
+            type(instance).objects.filter(pk=instance.pk).update(**changed)
+            for field, value in changed.items():
+                setattr(instance, field, value)
+
+        return instance
+
+
+class BarberSerializer(ChangedFieldsUpdateMixin, ModelSerializer):
     class Meta:
         model = Barber
         fields = ["id", "user", "phone_number"]
+        read_only_fields = ["id", "user"]
 
     def validate_phone_number(self, phone_number):
         if phone_number.startswith("+") and phone_number.startswith("+55"):
@@ -29,16 +62,21 @@ class BarberSerializer(ModelSerializer):
         else:
             raise ValidationError("O número deve começar com '(+55)'.")
 
+        return phone_number
 
-class UserSerialzier(ModelSerializer):
+
+class UserSerialzier(ChangedFieldsUpdateMixin, ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "first_name", "last_name", "user_model"]
+        read_only_fields = ["id", "user_model"]
 
     def validate_username(self, username):
-        user = User.objects.filter(username=username).first()
+        users = User.objects.filter(username=username)
+        if self.instance:
+            users = users.exclude(pk=self.instance.pk)
 
-        if user:
+        if users.exists():
             raise ValidationError(f"O username {username}, já está em uso!")
 
         if username == "":
@@ -65,29 +103,41 @@ class UserSerialzier(ModelSerializer):
         return last_name
 
     def validate(self, data):
-        first_name = data.get("first_name")
-        last_name = data.get("last_name")
-        username = data.get("username")
-
-        if username and first_name and last_name:
-            user = User.objects.update(
-                username=username, first_name=first_name, last_name=last_name
-            )
-        elif username and first_name:
-            user = User.objects.update(username=username, first_name=first_name)
-        elif username and last_name:
-            user = User.objects.update(username=username, last_name=last_name)
-        elif first_name and last_name:
-            user = User.objects.update(first_name=first_name, last_name=last_name)
-        elif username:
-            user = User.objects.update(username=username)
-        elif first_name:
-            user = User.objects.update(first_name=first_name)
-        elif last_name:
-            user = User.objects.update(last_name=last_name)
-        else:
+        if not data:
             raise ValidationError(
                 "Alguma informação precisa ser passada para a atualização!"
             )
 
-        return user
+        return data
+
+
+class BarberProfile:
+    # Read-only profile payload, built from one joined .values() row instead
+    # of a serializer per model.
+    FIELDS = (
+        "id",
+        "phone_number",
+        "updated_at",
+        "user_id",
+        "user__username",
+        "user__first_name",
+        "user__last_name",
+    )
+
+    @staticmethod
+    def from_values(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": row["user_id"],
+            "ref": str(row["id"]),
+            "username": row["user__username"],
+            "first_name": row["user__first_name"],
+            "last_name": row["user__last_name"],
+            "phone_number": row["phone_number"],
+        }
+
+    @staticmethod
+    def etag(profile: Dict[str, Any]) -> str:
+        # Hashes the payload itself, so edits made through the admin change
+        # it too.
+        content = "|".join(str(profile[key]) for key in sorted(profile))
+        return f'"{md5(content.encode()).hexdigest()}"'
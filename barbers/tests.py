@@ -1,3 +1,406 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from barber_shop.querylog import QueryInspector
+from barbers.models import Barber
+from schedules.models import Scheduling
+from schedules.services import SlotConflict
+
+
+def create_barber(username, first_name="Barbeiro"):
+    user = User.objects.create(
+        username=username, first_name=first_name, last_name="Teixeira"
+    )
+    return Barber.objects.create(user=user, phone_number="+5511999999999")
+
+
+def create_schedulings(barber, amount, start=datetime(2030, 3, 4, 9), confirmed=True):
+    start = start.replace(tzinfo=dt_timezone.utc)
+    Scheduling.objects.bulk_create(
+        Scheduling(
+            provider=barber,
+            date_time=start + timedelta(days=index),
+            client_name=f"Cliente Numero{index}",
+            client_phone=f"+55119{index:08d}",
+            state="CONF" if confirmed else "NCNF",
+            confirmed=confirmed,
+            work_type="CT",
+        )
+        for index in range(amount)
+    )
+
+
+class BarberListingTimesQueriesTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber("joao")
+        self.client = APIClient()
+        self.client.force_authenticate(self.barber.user)
+
+    def test_queries_do_not_grow_with_schedulings(self):
+        create_schedulings(self.barber, 1)
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                "/barber/api/v1/list-times-provider/", {"username": "joao"}
+            )
+        self.assertEqual(len(response.data["scheduling_list"]), 1)
+
+        create_schedulings(self.barber, 20, start=datetime(2030, 6, 3, 9))
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                "/barber/api/v1/list-times-provider/", {"username": "joao"}
+            )
+        self.assertEqual(len(response.data["scheduling_list"]), 21)
+
+
+class BarberListingTimesPaginationTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber("joao")
+        self.client = APIClient()
+        self.client.force_authenticate(self.barber.user)
+
+    def test_cursor_walks_every_scheduling_once(self):
+        create_schedulings(self.barber, 7)
+        # Same date_time as existing rows, so ties are broken by id.
+        create_schedulings(self.barber, 5, confirmed=False)
+
+        ids = []
+        url = "/barber/api/v1/list-times-provider/?username=joao&page_size=3"
+        while url:
+            response = self.client.get(url)
+            ids += [row["id"] for row in response.data["scheduling_list"]]
+            url = response.data["next"]
+
+        self.assertEqual(
+            sorted(ids), sorted(Scheduling.objects.values_list("id", flat=True))
+        )
+        self.assertEqual(len(ids), 12)
+
+    def test_filters(self):
+        create_schedulings(self.barber, 10)
+        Scheduling.objects.filter(date_time__day=5).update(state="NCNF")
+
+        response = self.client.get(
+            "/barber/api/v1/list-times-provider/",
+            {"username": "joao", "from": "2030-03-05", "to": "2030-03-08"},
+        )
+        self.assertEqual(len(response.data["scheduling_list"]), 4)
+
+        response = self.client.get(
+            "/barber/api/v1/list-times-provider/",
+            {"username": "joao", "state": "NCNF"},
+        )
+        self.assertEqual(len(response.data["scheduling_list"]), 1)
+
+
+class BarberConfirmSchedulingTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber("joao")
+        self.client = APIClient()
+        self.client.force_authenticate(self.barber.user)
+        self.url = f"/barber/api/v1/confirm-scheduling/{self.barber.id}/"
+        create_schedulings(self.barber, 1, confirmed=False)
+        self.scheduling = Scheduling.objects.get()
+        self.data = {
+            "client_name": self.scheduling.client_name,
+            "client_phone": self.scheduling.client_phone,
+            "date_time": self.scheduling.date_time.isoformat(),
+        }
+
+    def test_confirms_under_the_day_lock(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, self.data, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["information"]["state"], "CONF")
+        writes = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+        self.assertEqual(len(writes), 3)
+        self.assertIn('"schedules_providerdaylock"', writes[0])
+        self.assertTrue(writes[-1].startswith('UPDATE "schedules_scheduling"'))
+
+        self.scheduling.refresh_from_db()
+        self.assertTrue(self.scheduling.confirmed)
+
+    def test_retry_changes_nothing(self):
+        self.client.put(self.url, self.data, format="json")
+        response = self.client.put(self.url, self.data, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Scheduling.objects.filter(state="CONF").count(), 1)
+
+    def test_clashing_confirmation(self):
+        create_schedulings(self.barber, 1)
+        Scheduling.objects.filter(confirmed=True).update(client_phone="+5511988887777")
+
+        response = self.client.put(self.url, self.data, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.scheduling.refresh_from_db()
+        self.assertFalse(self.scheduling.confirmed)
+
+    def test_overlapping_confirmation(self):
+        # A confirmed 90 minute booking at 8:30 runs until 10:00, past the
+        # pending one's 9:00 start.
+        Scheduling.objects.create(
+            provider=self.barber,
+            date_time=self.scheduling.date_time - timedelta(minutes=30),
+            client_name="Outro Cliente",
+            client_phone="+5511988887777",
+            state="CONF",
+            confirmed=True,
+            work_type="CP",
+        )
+
+        response = self.client.put(self.url, self.data, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.scheduling.refresh_from_db()
+        self.assertFalse(self.scheduling.confirmed)
+
+        # The bulk endpoint decides the same way.
+        response = self.client.put(f"{self.url}bulk/", [self.data], format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_same_slot_for_another_barber(self):
+        # Conflicts are per provider: another barber's booking in the same
+        # slot doesn't keep this one from being confirmed.
+        other = create_barber("pedro")
+        Scheduling.objects.create(
+            provider=other,
+            date_time=self.scheduling.date_time,
+            client_name="Outro Cliente",
+            client_phone="+5511988887777",
+            state="CONF",
+            confirmed=True,
+            work_type="CP",
+        )
+        self.assertFalse(
+            SlotConflict.has_conflict(self.barber, self.scheduling.date_time, "CT")
+        )
+        self.assertTrue(
+            SlotConflict.has_conflict(other, self.scheduling.date_time, "CT")
+        )
+
+        response = self.client.put(self.url, self.data, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            Scheduling.objects.filter(
+                date_time=self.scheduling.date_time, confirmed=True
+            ).count(),
+            2,
+        )
+
+
+class BarberBulkConfirmSchedulingTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber("joao")
+        self.client = APIClient()
+        self.client.force_authenticate(self.barber.user)
+        self.url = f"/barber/api/v1/confirm-scheduling/{self.barber.id}/bulk/"
+
+    def confirmation(self, scheduling):
+        return {
+            "client_name": scheduling.client_name,
+            "client_phone": scheduling.client_phone,
+            "date_time": scheduling.date_time.isoformat(),
+        }
+
+    def test_confirms_every_pending_scheduling(self):
+        create_schedulings(self.barber, 10, confirmed=False)
+        items = [self.confirmation(row) for row in Scheduling.objects.all()]
+
+        response = self.client.put(self.url, items, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Scheduling.objects.filter(state="CONF").count(), 10)
+
+    def test_reports_errors_per_item(self):
+        create_schedulings(self.barber, 2, confirmed=False)
+        first, second = Scheduling.objects.order_by("id")
+        # Same slot as the first one, so only one of them can be confirmed.
+        create_schedulings(self.barber, 1, confirmed=False)
+        Scheduling.objects.filter(client_phone=first.client_phone).exclude(
+            id=first.id
+        ).update(client_phone="+5511988887777", client_name="Outro Cliente")
+        clash = Scheduling.objects.get(client_phone="+5511988887777")
+
+        items = [
+            self.confirmation(first),
+            {"client_name": "Cliente Teste", "date_time": "2030-03-04T09:00:00Z"},
+            self.confirmation(clash),
+            self.confirmation(second),
+        ]
+        response = self.client.put(self.url, items, format="json")
+
+        self.assertEqual(response.status_code, 207)
+        results = response.data["results"]
+        self.assertEqual([result["index"] for result in results], [0, 1, 2, 3])
+        self.assertIn("scheduling", results[0])
+        self.assertIn("client_phone", results[1]["errors"])
+        self.assertEqual(
+            results[2]["errors"],
+            ["Infelizmente o horário selecionado está indisponível!"],
+        )
+        self.assertIn("scheduling", results[3])
+        self.assertEqual(
+            set(Scheduling.objects.filter(confirmed=True).values_list("id", flat=True)),
+            {first.id, second.id},
+        )
+
+
+class BarberDetailUpdateTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber("joao")
+        self.others = [create_barber("pedro"), create_barber("maria")]
+        self.client = APIClient()
+        self.client.force_authenticate(self.barber.user)
+        self.url = f"/barber/api/v1/barber-updates/{self.barber.id}/"
+
+    def test_updates_only_the_barber_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(
+                self.url, {"first_name": "Joaquim"}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user_update"][0]["first_name"], "Joaquim")
+
+        updates = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('UPDATE "auth_user"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('SET "first_name"', updates[0])
+        self.assertNotIn("last_name", updates[0])
+
+        self.assertEqual(
+            User.objects.filter(first_name="Joaquim").get(), self.barber.user
+        )
+        self.assertEqual(User.objects.filter(first_name="Barbeiro").count(), 2)
+
+    def test_update_has_no_repeated_queries(self):
+        with QueryInspector.recording() as report:
+            self.client.put(self.url, {"phone_number": "+5511988887777"}, format="json")
+            self.client.put(self.url, {"first_name": "Joaquim"}, format="json")
+
+        self.assertEqual(report.endpoints["BarberDetailView"]["requests"], 2)
+        self.assertEqual(report.duplicates("BarberDetailView"), {}, report.summary())
+
+    def test_unchanged_values_are_not_written(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(
+                self.url, {"last_name": "Teixeira"}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            [query for query in queries if query["sql"].startswith("UPDATE")]
+        )
+
+    def test_updates_phone_number(self):
+        response = self.client.put(
+            self.url, {"phone_number": "+5511988887777"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.barber.refresh_from_db()
+        self.assertEqual(self.barber.phone_number, "+5511988887777")
+        self.assertEqual(
+            Barber.objects.filter(phone_number="+5511999999999").count(), 2
+        )
+
+    def test_barber_owner_is_read_only(self):
+        other = self.others[0]
+        owner = self.barber.user_id
+        response = self.client.put(
+            self.url,
+            {"phone_number": "+5511988887777", "user": other.user.id},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.barber.refresh_from_db()
+        self.assertEqual(self.barber.user_id, owner)
+        self.assertEqual(self.barber.phone_number, "+5511988887777")
+        self.assertEqual(Barber.objects.filter(user=other.user).count(), 1)
+
+    def test_user_relations_are_read_only(self):
+        other = self.others[0]
+        response = self.client.put(
+            self.url,
+            {"first_name": "Joaquim", "user_model": [other.id], "id": other.user.id},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user_update"][0]["id"], self.barber.user.id)
+        self.assertEqual(
+            response.data["user_update"][0]["user_model"], [self.barber.id]
+        )
+        other.refresh_from_db()
+        self.assertEqual(other.user.first_name, "Barbeiro")
+        self.assertEqual(User.objects.get(id=self.barber.user.id).first_name, "Joaquim")
+
+
+class BarberDetailReadTest(TestCase):
+    def setUp(self):
+        self.barber = create_barber("joao")
+        self.client = APIClient()
+        self.client.force_authenticate(self.barber.user)
+        self.url = f"/barber/api/v1/barber-updates/{self.barber.id}/"
+
+    def test_profile_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.data["informations"],
+            [
+                {
+                    "id": self.barber.user.id,
+                    "ref": str(self.barber.id),
+                    "username": "joao",
+                    "first_name": "Barbeiro",
+                    "last_name": "Teixeira",
+                    "phone_number": "+5511999999999",
+                }
+            ],
+        )
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    def test_conditional_requests(self):
+        response = self.client.get(self.url)
+
+        etag = response["ETag"]
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        self.assertEqual(
+            self.client.get(
+                self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+            ).status_code,
+            304,
+        )
+
+        self.client.put(self.url, {"first_name": "Joaquim"}, format="json")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["informations"][0]["first_name"], "Joaquim")
+
+    def test_unknown_barber(self):
+        response = self.client.get("/barber/api/v1/barber-updates/nao-existe/")
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 404)
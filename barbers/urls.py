@@ -7,6 +7,7 @@ from rest_framework_simplejwt.views import (
 )
 
 from barbers.views import (
+    BarberBulkConfirmSchedulingView,
     BarberCreateView,
     BarberDetailView,
     BarberListingTimesView,
@@ -29,6 +30,10 @@ urlpatterns = [
     path(
         "v1/confirm-scheduling/<str:uuid>/", BarberUpdateSchedulingStatusView.as_view()
     ),
+    path(
+        "v1/confirm-scheduling/<str:uuid>/bulk/",
+        BarberBulkConfirmSchedulingView.as_view(),
+    ),
     # Token
     path("v1/token/loggin/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("v1/token/verify/", TokenVerifyView.as_view(), name="token_verify"),
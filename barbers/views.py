@@ -1,8 +1,14 @@
 import re
+from calendar import timegm
+from datetime import datetime
 
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from rest_framework import serializers
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import (
     CreateAPIView,
     ListCreateAPIView,
@@ -13,25 +19,61 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from barbers.models import Barber
-from barbers.serializer import BarberSerializer, UserSerialzier
+from barbers.serializer import BarberProfile, BarberSerializer, UserSerialzier
 from schedules.models import Scheduling
-from schedules.serializer import SchedulingSerializer
+from schedules.pagination import SchedulingCursorPagination
+from schedules.serializer import (
+    SchedulingConfirmationSerializer,
+    SchedulingRows,
+    SchedulingSerializer,
+)
+from schedules.services import Booking, BookingConflict
+from schedules.utils import DateRange, Verifications
+from schedules.views import BatchView
 
 
 class BarberListingTimesView(ListCreateAPIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = SchedulingCursorPagination
+
+    def filter_queryset(self, queryset):
+        params = self.request.query_params
+        date_from = params.get("from")
+        date_to = params.get("to")
+        state = params.get("state")
+
+        try:
+            if date_from:
+                day = datetime.strptime(date_from, "%Y-%m-%d").date()
+                queryset = queryset.filter(date_time__gte=DateRange.day_bounds(day)[0])
+            if date_to:
+                day = datetime.strptime(date_to, "%Y-%m-%d").date()
+                queryset = queryset.filter(date_time__lt=DateRange.day_bounds(day)[1])
+        except ValueError:
+            raise serializers.ValidationError(
+                "As datas devem estar no formato AAAA-MM-DD!"
+            )
+
+        if state:
+            if state not in dict(Scheduling.ACTION_STATES):
+                raise serializers.ValidationError("Status do horário inexistente!")
+            queryset = queryset.filter(state=state)
+
+        return queryset
 
     def get(self, request, *args, **kwargs):
         username = request.query_params.get("username")
 
-        user = User.objects.filter(username=username).first()
+        barber = (
+            Barber.objects.select_related("user")
+            .filter(user__username=username)
+            .first()
+        )
 
-        if user:
-            barber = Barber.objects.filter(user=user).first()
-            if barber:
-                qs = Scheduling.objects.filter(provider=barber)
-                scheduling_serializer = SchedulingSerializer(qs, many=True)
-                return Response(data={"scheduling_list": scheduling_serializer.data})
+        if barber:
+            qs = self.filter_queryset(Scheduling.objects.filter(provider=barber))
+            page = self.paginate_queryset(qs.values(*SchedulingRows.FIELDS))
+            return self.get_paginated_response(SchedulingRows.from_values(page))
         return Response(data={"error": "User not found!"}, status=400)
 
 
@@ -44,45 +86,34 @@ class BarberDetailView(RetrieveUpdateAPIView):
         return super().get_object()
 
     def get_serializer_class(self, element, data=None, serializer_type=None):
-        if self.request.method == "PUT":
-            if serializer_type == "barber":
-                serializer = BarberSerializer(element, partial=True, data=data)
-                if serializer.is_valid():
-                    serializer = [serializer.data]
-                    return serializer
-                else:
-                    return serializer.errors
-            else:
-                serializer = UserSerialzier(element, partial=True, data=data)
-                if serializer.is_valid():
-                    serializer = [serializer.data]
-                    return serializer
-                else:
-                    return serializer.errors
+        if serializer_type == "barber":
+            serializer = BarberSerializer(element, partial=True, data=data)
         else:
-            if serializer_type == "barber":
-                serializer = BarberSerializer(element)
-                return serializer.data
-            else:
-                serializer = UserSerialzier(element)
-                return serializer.data
+            serializer = UserSerialzier(element, partial=True, data=data)
 
-    def get_queryset(self, data=None, serializer_type=None):
-        uuid = self.kwargs.get("uuid")
-        barber = Barber.objects.filter(id=uuid).first()
-        user = User.objects.filter(username=barber.user).first()
-        if self.request.method == "PUT":
-            if serializer_type == "barber":
-                barber = self.get_serializer_class(barber, data, "barber")
-                return barber
-            else:
-                user = self.get_serializer_class(user, data)
-                return user
+        if serializer.is_valid():
+            serializer.save()
+            if serializer_type != "barber" and serializer.changed_fields:
+                # The profile Last-Modified follows the barber row, so user
+                # edits bump it too.
+                Barber.objects.filter(id=self.kwargs.get("uuid")).update(
+                    updated_at=timezone.now()
+                )
+            serializer = [serializer.data]
+            return serializer
         else:
-            barber = self.get_serializer_class(barber, serializer_type="barber")
-            user = self.get_serializer_class(user)
+            return serializer.errors
+
+    def get_queryset(self, data=None, serializer_type=None):
+        uuid = Verifications.parse_uuid(self.kwargs.get("uuid"))
+        barber = Barber.objects.select_related("user").filter(id=uuid).first()
+
+        if not barber:
+            raise NotFound("User not found!")
 
-            return barber, user
+        if serializer_type == "barber":
+            return self.get_serializer_class(barber, data, "barber")
+        return self.get_serializer_class(barber.user, data)
 
     def put(self, request, *args, **kwargs):
         data = request.data
@@ -96,74 +127,78 @@ class BarberDetailView(RetrieveUpdateAPIView):
         return Response(data={"user_update": qs}, status=200)
 
     def get(self, request, *args, **kwargs):
-        barber, user = self.get_queryset()
+        row = (
+            Barber.objects.filter(id=Verifications.parse_uuid(self.kwargs.get("uuid")))
+            .values(*BarberProfile.FIELDS)
+            .first()
+        )
+
+        if not row:
+            return Response(data={"error": "User not found!"}, status=404)
 
-        barber_id = barber.get("id")
-        barber_phone = barber.get("phone_number")
-        user_id = user.get("id")
-        username = user.get("username")
-        first_name = user.get("first_name")
-        last_name = user.get("last_name")
+        profile = BarberProfile.from_values(row)
+        etag = BarberProfile.etag(profile)
+        last_modified = timegm(row["updated_at"].utctimetuple())
 
-        informations = {
-            "id": user_id,
-            "ref": barber_id,
-            "username": username,
-            "first_name": first_name,
-            "last_name": last_name,
-            "phone_number": barber_phone,
-        }
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        response = not_modified or Response(data={"informations": [profile]})
 
-        qs = [informations]
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        # Clients keep the profile but check back every time.
+        patch_cache_control(response, private=True, no_cache=True)
 
-        return Response(data={"informations": qs})
+        return response
 
 
 class BarberUpdateSchedulingStatusView(UpdateAPIView):
     permission_classes = [IsAuthenticated]
     lookup_url_kwarg = "uuid"
 
-    def get_object(self):
-        self.kwargs["uuid"]
-        return super().get_object()
+    def put(self, request, *args, **kwargs):
+        serializer = SchedulingConfirmationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-    def get_queryset(self, barber_id, client_name, client_phone, date_time):
-        barber = Barber.objects.filter(id=barber_id).first()
+        try:
+            scheduling = Booking.confirm(
+                Verifications.parse_uuid(self.kwargs.get("uuid")),
+                **serializer.validated_data,
+            )
+        except BookingConflict as error:
+            raise serializers.ValidationError(str(error))
 
-        scheduling = Scheduling.objects.filter(
-            provider=barber,
-            client_name=client_name,
-            client_phone=client_phone,
-            date_time=date_time,
-        ).first()
-        return scheduling
+        if not scheduling:
+            raise serializers.ValidationError("O horário não pode ser confirmado!")
 
-    def get_serializer_class(self, scheduling, data):
-        serializer = SchedulingSerializer(scheduling, data=data, partial=True)
-        if serializer.is_valid():
-            return serializer.data
-        else:
-            serializer.errors
+        return Response(data={"information": SchedulingSerializer(scheduling).data})
 
+
+class BarberBulkConfirmSchedulingView(BatchView):
     def put(self, request, *args, **kwargs):
-        data = request.data
-        data["state"] = "CONF"
-
-        client_name = data.get("client_name")
-        client_phone = data.get("client_phone")
-        date_time = data.get("date_time")
-        uuid = self.kwargs.get("uuid")
-
-        qs = self.get_queryset(
-            barber_id=uuid,
-            client_name=client_name,
-            client_phone=client_phone,
-            date_time=date_time,
+        barber = (
+            Barber.objects.select_related("user")
+            .filter(id=Verifications.parse_uuid(self.kwargs.get("uuid")))
+            .first()
         )
 
-        serializer = self.get_serializer_class(scheduling=qs, data=data)
+        if not barber:
+            return Response(data={"error": "User not found!"}, status=400)
+
+        item_serializers = self.validate_items(
+            self.get_items(), SchedulingConfirmationSerializer
+        )
+        confirmed, errors = Booking.confirm_many(
+            barber,
+            [
+                serializer.validated_data
+                for serializer in item_serializers
+                if not serializer.errors
+            ],
+        )
 
-        return Response(data={"information": serializer})
+        return self.batch_response(item_serializers, confirmed, errors)
 
 
 class BarberCreateView(CreateAPIView):
@@ -0,0 +1,42 @@
+import os
+import statistics
+import time
+from typing import Callable, List
+
+import django
+
+
+def setup_django() -> None:
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "barber_shop.settings")
+    django.setup()
+
+
+def create_database(keepdb: bool = False) -> str:
+    # Benchmarks run against Django's test database so they never touch the
+    # development data. Returns the original name for destroy_database.
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    return old_name
+
+
+def destroy_database(old_name: str, keepdb: bool = False) -> None:
+    from django.db import connection
+
+    connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def measure(function: Callable, repeat: int = 20) -> List[float]:
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return timings
+
+
+def median(timings: List[float]) -> float:
+    return statistics.median(timings)
@@ -0,0 +1,94 @@
+"""
+Compares the stdlib JSON rendering (DRF's JSONRenderer, Django's
+JsonResponse with DjangoJSONEncoder) with the orjson renderer on the payloads
+of the listing endpoints: a barber's appointment listing, the multi-day
+availability of every barber and raw .values() rows, whose datetime and UUID
+values the encoder has to convert itself.
+
+Usage: python -m benchmarks.json_rendering --rows 10000 --barbers 10
+"""
+
+import argparse
+import json
+from datetime import date
+
+from benchmarks import create_database, destroy_database, measure, median, setup_django
+
+
+def payloads(barbers_amount, rows):
+    from django.conf import settings
+    from django.test import Client
+
+    from benchmarks.seed import seed_barbers, seed_schedulings
+    from schedules.models import Scheduling
+    from schedules.serializer import SchedulingRows
+
+    settings.ALLOWED_HOSTS = ["*"]
+    barbers = seed_barbers(barbers_amount)
+    created = seed_schedulings(barbers, rows, date(2030, 1, 1))
+    print(f"seeded {created} appointments for {barbers_amount} barbers")
+
+    queryset = Scheduling.objects.order_by("date_time", "id")
+    availability = Client().get(
+        "/api/v1/schedule-list/", {"from": "2030-01-01", "to": "2030-01-31"}
+    )
+
+    return {
+        "appointment listing": SchedulingRows.from_values(
+            queryset.values(*SchedulingRows.FIELDS)
+        ),
+        "31-day availability": availability.data,
+        "raw rows (datetime, UUID)": list(
+            queryset.values("id", "provider_id", "date_time", "state")
+        ),
+    }
+
+
+def run(barbers_amount, rows, repeat):
+    from django.core.serializers.json import DjangoJSONEncoder
+    from rest_framework.renderers import JSONRenderer
+
+    from barber_shop.renderers import ORJSONRenderer
+
+    renderers = {
+        "DRF JSONRenderer": JSONRenderer().render,
+        "json + DjangoJSONEncoder": lambda data: json.dumps(
+            data, cls=DjangoJSONEncoder
+        ).encode(),
+        "ORJSONRenderer": ORJSONRenderer().render,
+    }
+
+    payloads_by_name = payloads(barbers_amount, rows)
+
+    print(f"{'payload':<28}{'renderer':<28}{'median (ms)':>12}{'size (KB)':>11}")
+    for name, data in payloads_by_name.items():
+        baseline = None
+        for renderer_name, render in renderers.items():
+            elapsed = median(measure(lambda: render(data), repeat))
+            size = len(render(data)) / 1024
+            baseline = baseline or elapsed
+            print(
+                f"{name:<28}{renderer_name:<28}{elapsed:>12.2f}{size:>11.1f}"
+                f"  {baseline / elapsed:.1f}x"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--barbers", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    old_name = create_database()
+    try:
+        run(args.barbers, args.rows, args.repeat)
+    finally:
+        destroy_database(old_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compares SchedulingSerializer(many=True) with the SchedulingRows read path
+on the same listing (query + serialization).
+
+Usage: python -m benchmarks.listing_serialization --rows 10000
+"""
+
+import argparse
+from datetime import date
+
+from benchmarks import create_database, destroy_database, measure, median, setup_django
+
+
+def run(rows, repeat):
+    from benchmarks.seed import seed_barbers, seed_schedulings
+    from schedules.models import Scheduling
+    from schedules.serializer import SchedulingRows, SchedulingSerializer
+
+    barber = seed_barbers(1)[0]
+    created = seed_schedulings([barber], rows, date(2020, 1, 1))
+    print(f"seeded {created} appointments")
+
+    queryset = Scheduling.objects.filter(provider=barber).order_by("date_time", "id")
+
+    def serializer():
+        return SchedulingSerializer(
+            queryset.select_related("provider__user"), many=True
+        ).data
+
+    def rows_path():
+        return SchedulingRows.from_values(queryset.values(*SchedulingRows.FIELDS))
+
+    serializer_ms = median(measure(serializer, repeat))
+    rows_ms = median(measure(rows_path, repeat))
+
+    print(f"{'path':<24}{'median (ms)':>14}{'per row (us)':>14}")
+    for name, elapsed in (
+        ("SchedulingSerializer", serializer_ms),
+        ("SchedulingRows", rows_ms),
+    ):
+        print(f"{name:<24}{elapsed:>14.2f}{elapsed * 1000 / created:>14.2f}")
+    print(f"speedup: {serializer_ms / rows_ms:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    old_name = create_database()
+    try:
+        run(args.rows, args.repeat)
+    finally:
+        destroy_database(old_name)
+
+
+if __name__ == "__main__":
+    main()
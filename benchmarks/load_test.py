@@ -0,0 +1,333 @@
+"""
+Offline load test of the booking and availability APIs: seeds barbers with
+years of appointments, drives every scenario with concurrent clients through
+the Django test client and reports latency percentiles, throughput and
+queries per request.
+
+Every run starts from a fresh database; with --runs N the timings are the
+medians of the N runs, which a single slow run can't move, while failures and
+queries per request are the worst of them.
+
+The results are compared with benchmarks/baselines/load_test.json and the run
+exits with status 1 when a scenario regressed: more failures or queries per
+request, or median p95 latency / throughput worse than the baseline by more
+than --tolerance.
+
+Usage:
+    python -m benchmarks.load_test --barbers 10 --years 2 --requests 500
+    python -m benchmarks.load_test --runs 5 --update-baseline
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from itertools import count
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Iterator, List
+
+from benchmarks import create_database, destroy_database, median, setup_django
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baselines" / "load_test.json"
+
+# Seeded history ends here, the scenarios book and confirm after it.
+HISTORY_END = date(2030, 1, 1)
+BOOKING_START = date(2031, 1, 6)
+
+# Working days per year times the slots of a day, ~70% of them taken.
+ROWS_PER_BARBER_YEAR = int(310 * 16 * 0.7)
+
+
+def percentile(timings: List[float], fraction: float) -> float:
+    return timings[min(int(len(timings) * fraction), len(timings) - 1)]
+
+
+def working_slots(start: date) -> Iterator[str]:
+    from schedules.availability import AvailabilityEngine, SlotTemplates
+
+    day = start
+    while True:
+        for time_ in AvailabilityEngine.available_times(
+            SlotTemplates.for_day(None, day), []
+        ):
+            yield f"{day.isoformat()}T{time_}:00Z"
+        day += timedelta(days=1)
+
+
+def build_scenarios(barbers, requests) -> Dict[str, Callable[[], Iterator]]:
+    # Each scenario yields (method, path, data, headers) for every request.
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from schedules.models import Scheduling
+    from schedules.utils import DateRange
+
+    headers = {
+        barber.id: {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(barber.user)}"}
+        for barber in barbers
+    }
+
+    def schedule_list():
+        for index in range(requests):
+            barber = barbers[index % len(barbers)]
+            day = HISTORY_END - timedelta(days=index % 365)
+            yield "get", f"/api/v1/schedule-list/{day}/", {
+                "provider": str(barber.id)
+            }, {}
+
+    def schedule_time():
+        slots = working_slots(BOOKING_START)
+        phones = count()
+        while True:
+            date_time = next(slots)
+            for barber in barbers:
+                yield "post", "/api/v1/schedule-time/", {
+                    "provider": str(barber.id),
+                    "date_time": date_time,
+                    "client_name": "Cliente Benchmark",
+                    "client_phone": f"+5511{next(phones):09d}",
+                    "work_type": "Corte",
+                }, {}
+
+    def list_times_provider():
+        for index in range(requests):
+            barber = barbers[index % len(barbers)]
+            yield "get", "/barber/api/v1/list-times-provider/", {
+                "username": barber.user.username,
+                "state": "CONF",
+            }, headers[barber.id]
+
+    def confirm_scheduling():
+        # The bookings created by the schedule-time scenario, loaded at once:
+        # the generator is advanced from every client thread.
+        pending = list(
+            Scheduling.objects.filter(
+                state="NCNF", date_time__gte=DateRange.day_bounds(BOOKING_START)[0]
+            ).values("provider_id", "client_name", "client_phone", "date_time")
+        )
+        for row in pending:
+            yield "put", f"/barber/api/v1/confirm-scheduling/{row['provider_id']}/", {
+                "client_name": row["client_name"],
+                "client_phone": row["client_phone"],
+                "date_time": row["date_time"].isoformat(),
+            }, headers[row["provider_id"]]
+
+    return {
+        "schedule-list": schedule_list,
+        "schedule-time": schedule_time,
+        "list-times-provider": list_times_provider,
+        "confirm-scheduling": confirm_scheduling,
+    }
+
+
+def drive(scenario: Iterator, requests: int, concurrency: int) -> Dict[str, float]:
+    from django.db import connection, connections
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    lock = Lock()
+    remaining = count()
+    latencies = []
+    queries = []
+    failures = []
+
+    def client_loop(_):
+        client = Client()
+        try:
+            while True:
+                with lock:
+                    if next(remaining) >= requests:
+                        return
+                    request = next(scenario, None)
+                if request is None:
+                    return
+
+                method, path, data, headers = request
+                if method == "get":
+                    call = lambda: client.get(path, data, **headers)  # noqa: E731
+                else:
+                    call = lambda: getattr(client, method)(  # noqa: E731
+                        path, data, content_type="application/json", **headers
+                    )
+
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = call()
+                    elapsed = (time.perf_counter() - start) * 1000
+
+                with lock:
+                    latencies.append(elapsed)
+                    queries.append(len(captured))
+                    if response.status_code >= 400:
+                        failures.append(response.status_code)
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(client_loop, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "failures": len(failures),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "queries_per_request": sum(queries) / len(queries),
+    }
+
+
+def run(args) -> Dict[str, Dict[str, float]]:
+    from django.conf import settings
+
+    from benchmarks.seed import seed_barbers, seed_schedulings
+    from schedules.cache import AvailabilityCache
+
+    settings.ALLOWED_HOSTS = ["*"]
+    barbers = seed_barbers(args.barbers)
+    created = seed_schedulings(
+        barbers,
+        ROWS_PER_BARBER_YEAR * args.barbers * args.years,
+        HISTORY_END - timedelta(days=365 * args.years),
+    )
+    print(f"seeded {created} appointments for {args.barbers} barbers")
+
+    results = {}
+    # Declared in dependency order: confirmations use the new bookings.
+    for name, scenario in build_scenarios(barbers, args.requests).items():
+        AvailabilityCache.backend().clear()
+        results[name] = drive(scenario(), args.requests, args.concurrency)
+
+    return results
+
+
+def combine(runs: List[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    # Counts are deterministic, any run that failed more or ran more queries
+    # is a regression. Timings are the medians across runs.
+    worst = {"failures", "queries_per_request"}
+    return {
+        name: {
+            key: (max if key in worst else median)([run[name][key] for run in runs])
+            for key in result
+        }
+        for name, result in runs[0].items()
+    }
+
+
+def regressions(results, baseline, tolerance) -> List[str]:
+    found = []
+
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+
+        if result["failures"] > expected["failures"]:
+            found.append(
+                f"{name}: {result['failures']} failed requests, "
+                f"baseline {expected['failures']}"
+            )
+        if result["queries_per_request"] > expected["queries_per_request"] + 0.01:
+            found.append(
+                f"{name}: {result['queries_per_request']:.2f} queries per request, "
+                f"baseline {expected['queries_per_request']:.2f}"
+            )
+        if result["p95_ms"] > expected["p95_ms"] * (1 + tolerance):
+            found.append(
+                f"{name}: median p95 {result['p95_ms']:.2f}ms, "
+                f"baseline {expected['p95_ms']:.2f}ms"
+            )
+        if result["throughput_rps"] < expected["throughput_rps"] * (1 - tolerance):
+            found.append(
+                f"{name}: median {result['throughput_rps']:.1f} req/s, "
+                f"baseline {expected['throughput_rps']:.1f} req/s"
+            )
+
+    return found
+
+
+def report(results) -> None:
+    print(
+        f"{'scenario':<22}{'req/s':>9}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+        f"{'p99 (ms)':>10}{'queries':>9}{'errors':>8}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<22}{result['throughput_rps']:>9.1f}{result['p50_ms']:>10.2f}"
+            f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+            f"{result['queries_per_request']:>9.2f}{result['failures']:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--barbers", type=int, default=5)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    runs = []
+    for _ in range(args.runs):
+        old_name = create_database()
+        try:
+            runs.append(run(args))
+        finally:
+            destroy_database(old_name)
+        report(runs[-1])
+
+    results = combine(runs)
+    if args.runs > 1:
+        print(f"\nmedians of {args.runs} runs")
+        report(results)
+
+    # Baselines only compare runs with the same data volume and load.
+    params = {
+        "barbers": args.barbers,
+        "years": args.years,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+    }
+
+    if args.update_baseline:
+        baseline = {
+            "params": params,
+            "scenarios": {
+                name: {key: round(value, 3) for key, value in result.items()}
+                for name, result in results.items()
+            },
+        }
+        args.baseline.parent.mkdir(exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}, run with --update-baseline")
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline["params"] != params:
+        print(f"baseline was recorded with {baseline['params']}, not comparing")
+        return
+
+    found = regressions(results, baseline["scenarios"], args.tolerance)
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Seeds Scheduling rows and times the hot lookups before and after the
+composite indexes / range predicates.
+
+Usage: python -m benchmarks.scheduling_queries --rows 1000000
+"""
+
+import argparse
+from datetime import date
+
+from benchmarks import create_database, destroy_database, measure, median, setup_django
+
+
+def build_querysets(barber, day, phone):
+    from schedules.models import Scheduling
+    from schedules.utils import DateRange
+
+    day_start, day_end = DateRange.day_bounds(day)
+
+    before = {
+        "schedule-list": Scheduling.objects.filter(
+            date_time__date=day, state="CONF", confirmed=True
+        ).order_by("date_time__time"),
+        "provider-day": Scheduling.objects.filter(provider=barber, date_time__date=day),
+        "client-day": Scheduling.objects.filter(
+            provider__user__first_name=barber.user.first_name,
+            client_phone=phone,
+            date_time__date=day,
+        ),
+    }
+    after = {
+        "schedule-list": Scheduling.objects.filter(
+            state="CONF",
+            confirmed=True,
+            date_time__gte=day_start,
+            date_time__lt=day_end,
+        ).order_by("date_time"),
+        "provider-day": Scheduling.objects.filter(
+            provider=barber, date_time__gte=day_start, date_time__lt=day_end
+        ),
+        "client-day": Scheduling.objects.filter(
+            provider=barber,
+            client_phone=phone,
+            date_time__gte=day_start,
+            date_time__lt=day_end,
+        ),
+    }
+    return before, after
+
+
+def time_queryset(queryset, repeat):
+    # .all() clones the queryset so every run hits the database.
+    return median(measure(lambda: list(queryset.all()), repeat))
+
+
+def run(rows, barbers_amount, repeat, explain):
+    from django.db import connection
+    from django.utils import timezone
+
+    from benchmarks.seed import seed_barbers, seed_schedulings
+    from schedules.models import Scheduling
+
+    barbers = seed_barbers(barbers_amount)
+    created = seed_schedulings(barbers, rows, date(2020, 1, 1))
+    print(f"seeded {created} appointments for {barbers_amount} barbers")
+
+    sample = Scheduling.objects.select_related("provider__user").order_by("id")[
+        created // 2
+    ]
+    day = timezone.localdate(sample.date_time)
+    before, after = build_querysets(sample.provider, day, sample.client_phone)
+    indexes = Scheduling._meta.indexes
+
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.remove_index(Scheduling, index)
+
+    results = {name: [time_queryset(qs, repeat)] for name, qs in before.items()}
+
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.add_index(Scheduling, index)
+
+    for name, queryset in after.items():
+        results[name].append(time_queryset(queryset, repeat))
+
+    print(f"{'query':<16}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for name, (before_ms, after_ms) in results.items():
+        speedup = before_ms / after_ms if after_ms else float("inf")
+        print(f"{name:<16}{before_ms:>14.3f}{after_ms:>14.3f}{speedup:>9.1f}x")
+
+    if explain:
+        for name, queryset in after.items():
+            print(f"\n-- {name}\n{queryset.explain()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--barbers", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--explain", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    old_name = create_database()
+    try:
+        run(args.rows, args.barbers, args.repeat, args.explain)
+    finally:
+        destroy_database(old_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import random
+from datetime import date, datetime, time, timedelta
+from typing import List
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from barbers.models import Barber
+from schedules.models import Scheduling
+
+WORK_TYPES = [code for code, _ in Scheduling.WORK_TYPES if code != "ND"]
+
+STATES = ["NCNF", "CONF", "CONF", "EXEC"]
+
+
+def seed_barbers(amount: int) -> List[Barber]:
+    barbers = []
+
+    for index in range(amount):
+        user = User.objects.create(
+            username=f"barber{index}",
+            first_name=f"Barber{index}",
+            last_name="Benchmark",
+        )
+        barbers.append(Barber.objects.create(user=user, phone_number="+55119999999"))
+
+    return barbers
+
+
+def day_slots(day: date) -> List[datetime]:
+    closing = 13 if day.weekday() == 5 else 18
+    start = timezone.make_aware(datetime.combine(day, time(9)))
+    amount = (closing - 9) * 2
+
+    return [start + timedelta(minutes=30 * index) for index in range(amount)]
+
+
+def seed_schedulings(
+    barbers: List[Barber],
+    rows: int,
+    start: date,
+    batch_size: int = 10000,
+    seed: int = 42,
+) -> int:
+    # Fills every barber's agenda day by day (Sundays excluded) until `rows`
+    # appointments exist, each slot taken with ~70% probability.
+    generator = random.Random(seed)
+    batch = []
+    created = 0
+    day = start
+
+    while created < rows:
+        if day.weekday() != 6:
+            for barber in barbers:
+                for slot in day_slots(day):
+                    if generator.random() > 0.7:
+                        continue
+
+                    state = generator.choice(STATES)
+                    batch.append(
+                        Scheduling(
+                            provider=barber,
+                            date_time=slot,
+                            client_name=f"Cliente {created}",
+                            client_phone=f"+5511{created:09d}",
+                            state=state,
+                            confirmed=state != "NCNF",
+                            work_type=generator.choice(WORK_TYPES),
+                        )
+                    )
+                    created += 1
+
+                    if len(batch) >= batch_size:
+                        Scheduling.objects.bulk_create(batch)
+                        batch = []
+
+                    if created >= rows:
+                        break
+                if created >= rows:
+                    break
+
+        day += timedelta(days=1)
+
+    if batch:
+        Scheduling.objects.bulk_create(batch)
+
+    return created
@@ -1,6 +1,11 @@
 from django.contrib import admin
 
-from schedules.models import Scheduling
+from schedules.models import (
+    BusinessHours,
+    BusinessHoursException,
+    HolidayCalendar,
+    Scheduling,
+)
 
 
 @admin.register(Scheduling)
@@ -13,3 +18,29 @@ class AdminScheduling(admin.ModelAdmin):
         "state",
         "work_type",
     )
+    list_select_related = ("provider__user",)
+
+
+@admin.register(HolidayCalendar)
+class AdminHolidayCalendar(admin.ModelAdmin):
+    list_display = ("year", "updated_at")
+
+
+@admin.register(BusinessHours)
+class AdminBusinessHours(admin.ModelAdmin):
+    list_display = (
+        "barber",
+        "weekday",
+        "opens",
+        "closes",
+        "lunch_start",
+        "lunch_end",
+        "closed",
+    )
+    list_select_related = ("barber__user",)
+
+
+@admin.register(BusinessHoursException)
+class AdminBusinessHoursException(admin.ModelAdmin):
+    list_display = ("barber", "date", "closed", "opens", "closes", "reason")
+    list_select_related = ("barber__user",)
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class SchedulesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "schedules"
+
+    def ready(self):
+        from barber_shop.database import configure_sqlite
+        from barber_shop.metrics import install_query_timer
+        from barber_shop.querylog import install_query_inspector
+
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(install_query_timer)
+        connection_created.connect(install_query_inspector)
@@ -0,0 +1,292 @@
+from datetime import date, datetime, time, timedelta
+from threading import Lock
+from time import monotonic, time_ns
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from schedules.cache import AvailabilityCache
+from schedules.models import BusinessHours, BusinessHoursException, Scheduling
+
+SLOT_MINUTES = 30
+
+
+def to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+class DayTemplate(NamedTuple):
+    # A working day is a bitmap of 30-minute slots: bit i is set when the slot
+    # starting `open_minute + i * SLOT_MINUTES` can be booked.
+    open_minute: int
+    close_minute: int
+    slots: int
+    mask: int
+    lunch: Optional[Tuple[int, int]] = None
+
+    @staticmethod
+    def compile(
+        opens: time,
+        closes: time,
+        lunch_start: Optional[time] = None,
+        lunch_end: Optional[time] = None,
+    ) -> "DayTemplate":
+        open_minute = to_minutes(opens)
+        close_minute = to_minutes(closes)
+        slots = max((close_minute - open_minute) // SLOT_MINUTES, 0)
+        mask = (1 << slots) - 1
+        lunch = None
+
+        if lunch_start and lunch_end:
+            lunch = (to_minutes(lunch_start), to_minutes(lunch_end))
+            first = max((lunch[0] - open_minute) // SLOT_MINUTES, 0)
+            last = min(-(-(lunch[1] - open_minute) // SLOT_MINUTES), slots)
+            if first < last:
+                mask &= ~(((1 << (last - first)) - 1) << first)
+
+        return DayTemplate(open_minute, close_minute, slots, mask, lunch)
+
+
+CLOSED = DayTemplate(0, 0, 0, 0)
+
+# Used for the weekdays without a BusinessHours row for the shop.
+DEFAULT_HOURS = {
+    0: DayTemplate.compile(time(9), time(18), time(12), time(13)),
+    1: DayTemplate.compile(time(9), time(18), time(12), time(13)),
+    2: DayTemplate.compile(time(9), time(18), time(12), time(13)),
+    3: DayTemplate.compile(time(9), time(18), time(12), time(13)),
+    4: DayTemplate.compile(time(9), time(18), time(12), time(13)),
+    5: DayTemplate.compile(time(9), time(13)),
+    6: CLOSED,
+}
+
+
+class SlotTemplates:
+    # Every process keeps its own compiled templates. A change to the hours
+    # drops the shared version once it commits, and a process whose
+    # templates were loaded under another version reloads them.
+    VERSION_KEY = "slot-templates-version"
+
+    # provider id (None for the shop) -> one template per weekday
+    _weeks: Dict[Any, Tuple[DayTemplate, ...]] = {}
+    # (provider id or None, date) -> template replacing the weekday one
+    _exceptions: Dict[Tuple[Any, date], DayTemplate] = {}
+    _loaded_at: Optional[float] = None
+    _version: Optional[int] = None
+    _lock = Lock()
+
+    @classmethod
+    def version(cls) -> int:
+        backend = AvailabilityCache.backend()
+        version = backend.get(cls.VERSION_KEY)
+
+        if version is None:
+            version = time_ns()
+            if not backend.add(cls.VERSION_KEY, version, None):
+                version = backend.get(cls.VERSION_KEY, version)
+
+        return version
+
+    @classmethod
+    async def aversion(cls) -> int:
+        backend = AvailabilityCache.backend()
+        version = await backend.aget(cls.VERSION_KEY)
+
+        if version is None:
+            version = time_ns()
+            if not await backend.aadd(cls.VERSION_KEY, version, None):
+                version = await backend.aget(cls.VERSION_KEY, version)
+
+        return version
+
+    @staticmethod
+    def compile_hours(row: BusinessHours) -> DayTemplate:
+        if row.closed:
+            return CLOSED
+        return DayTemplate.compile(
+            row.opens, row.closes, row.lunch_start, row.lunch_end
+        )
+
+    @staticmethod
+    def compile_exception(row: BusinessHoursException) -> DayTemplate:
+        if row.closed or not (row.opens and row.closes):
+            return CLOSED
+        return DayTemplate.compile(row.opens, row.closes)
+
+    @classmethod
+    def load(cls, version: Optional[int] = None) -> None:
+        # Read before the rows: a change committing in between drops it and
+        # the next lookup loads again.
+        if version is None:
+            version = cls.version()
+        shop = dict(DEFAULT_HOURS)
+        barbers: Dict[Any, Dict[int, DayTemplate]] = {}
+
+        for row in BusinessHours.objects.all():
+            if row.barber_id is None:
+                shop[row.weekday] = cls.compile_hours(row)
+            else:
+                barbers.setdefault(row.barber_id, {})[row.weekday] = cls.compile_hours(
+                    row
+                )
+
+        weeks = {None: tuple(shop[weekday] for weekday in range(7))}
+        for barber_id, days in barbers.items():
+            weeks[barber_id] = tuple(
+                days.get(weekday, shop[weekday]) for weekday in range(7)
+            )
+
+        exceptions = {
+            (row.barber_id, row.date): cls.compile_exception(row)
+            for row in BusinessHoursException.objects.filter(
+                date__gte=timezone.localdate() - timedelta(days=1)
+            )
+        }
+
+        with cls._lock:
+            cls._weeks = weeks
+            cls._exceptions = exceptions
+            cls._loaded_at = monotonic()
+            cls._version = version
+
+    @classmethod
+    def fresh(cls, version: int) -> bool:
+        return (
+            cls._loaded_at is not None
+            and cls._version == version
+            and monotonic() - cls._loaded_at
+            < settings.BUSINESS_HOURS_TTL.total_seconds()
+        )
+
+    @classmethod
+    def refresh(cls) -> None:
+        version = cls.version()
+        if not cls.fresh(version):
+            cls.load(version)
+
+    @classmethod
+    def for_day(cls, provider_id: Any, day: date) -> DayTemplate:
+        cls.refresh()
+        return cls.lookup(provider_id, day)
+
+    @classmethod
+    async def afor_day(cls, provider_id: Any, day: date) -> DayTemplate:
+        version = await cls.aversion()
+        if not cls.fresh(version):
+            await sync_to_async(cls.load)(version)
+
+        return cls.lookup(provider_id, day)
+
+    @classmethod
+    def lookup(cls, provider_id: Any, day: date) -> DayTemplate:
+        exceptions = cls._exceptions
+        template = exceptions.get((provider_id, day)) or exceptions.get((None, day))
+
+        if template is None:
+            week = cls._weeks.get(provider_id) or cls._weeks[None]
+            template = week[day.weekday()]
+
+        return template
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._loaded_at = None
+
+    @classmethod
+    def invalidate(cls) -> None:
+        cls.clear()
+        AvailabilityCache.backend().delete(cls.VERSION_KEY)
+
+
+class AvailabilityEngine:
+    @staticmethod
+    def interval_mask(template: DayTemplate, start_minute: int, minutes: int) -> int:
+        begin = start_minute - template.open_minute
+        first = max(begin // SLOT_MINUTES, 0)
+        last = min(-(-(begin + minutes) // SLOT_MINUTES), template.slots)
+
+        if first >= last:
+            return 0
+
+        return ((1 << (last - first)) - 1) << first
+
+    @staticmethod
+    def booked_mask(
+        template: DayTemplate, bookings: Iterable[Tuple[datetime, str]]
+    ) -> int:
+        mask = 0
+
+        for date_time, work_type in bookings:
+            local = timezone.localtime(date_time)
+            mask |= AvailabilityEngine.interval_mask(
+                template,
+                local.hour * 60 + local.minute,
+                Scheduling.WORK_DURATIONS.get(work_type, SLOT_MINUTES),
+            )
+
+        return mask
+
+    @staticmethod
+    def free_mask(
+        template: DayTemplate,
+        bookings: Iterable[Tuple[datetime, str]],
+        minutes: int = SLOT_MINUTES,
+    ) -> int:
+        free = template.mask & ~AvailabilityEngine.booked_mask(template, bookings)
+
+        # A service longer than one slot only fits where the following slots
+        # are free too.
+        fits = free
+        for shift in range(1, -(-minutes // SLOT_MINUTES)):
+            fits &= free >> shift
+
+        return fits
+
+    @staticmethod
+    def free_starts(template: DayTemplate, free: int) -> Iterator[int]:
+        for index in range(template.slots):
+            if free >> index & 1:
+                yield template.open_minute + index * SLOT_MINUTES
+
+    @staticmethod
+    def available_times(
+        template: DayTemplate,
+        bookings: Iterable[Tuple[datetime, str]],
+        minutes: int = SLOT_MINUTES,
+    ) -> List[str]:
+        free = AvailabilityEngine.free_mask(template, bookings, minutes)
+
+        return [
+            f"{start // 60:02d}:{start % 60:02d}"
+            for start in AvailabilityEngine.free_starts(template, free)
+        ]
+
+    @staticmethod
+    def as_slots(day: date, times: Iterable[str]) -> List[Dict[str, str]]:
+        return [{"date_time": f"{day.isoformat()}T{time}:00"} for time in times]
+
+    @staticmethod
+    def range_availability(
+        keys: Iterable[Tuple[Any, date]],
+        bookings: Iterable[Tuple[Any, datetime, str]],
+        minutes: int = SLOT_MINUTES,
+    ) -> Dict[Tuple[Any, date], List[str]]:
+        # bookings are (provider_id, date_time, work_type) rows for the whole
+        # window, grouped here so the database is queried only once. The
+        # templates were refreshed by the caller.
+        grouped: Dict[Tuple[Any, date], List[Tuple[datetime, str]]] = {}
+        for provider_id, date_time, work_type in bookings:
+            key = (provider_id, timezone.localdate(date_time))
+            grouped.setdefault(key, []).append((date_time, work_type))
+
+        return {
+            (provider_id, day): AvailabilityEngine.available_times(
+                SlotTemplates.lookup(provider_id, day),
+                grouped.get((provider_id, day), ()),
+                minutes,
+            )
+            for provider_id, day in keys
+        }
@@ -0,0 +1,196 @@
+import time
+from datetime import date
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class AvailabilityCache:
+    # Free slots ("HH:MM") of one provider on one day. Entries are dropped by
+    # the Scheduling signals and by the confirmation view once the write
+    # commits, the timeout only bounds how long a missed invalidation can
+    # live.
+    #
+    # The hit/miss counters are kept per process: with several workers,
+    # /api/v1/availability-cache/ reports the worker that answered it.
+    #
+    # Every day also has a version, the ETag of its availability responses,
+    # and the slots are cached under it. Invalidating drops the version and
+    # the next read starts a new one from the clock, so a version is never
+    # handed out twice, even after an eviction. A miss computed from rows
+    # older than a write is stored under the version read before it, which
+    # the write's invalidation retires, so it's never served as newer.
+    _counters = {"hits": 0, "misses": 0}
+    _lock = Lock()
+
+    @staticmethod
+    def backend():
+        return caches[settings.AVAILABILITY_CACHE]
+
+    @staticmethod
+    def key(provider_id: Any, day: date, version: int) -> str:
+        return f"availability:{provider_id}:{day.isoformat()}:{version:x}"
+
+    @staticmethod
+    def version_key(provider_id: Any, day: date) -> str:
+        return f"availability-version:{provider_id}:{day.isoformat()}"
+
+    @classmethod
+    def version(cls, provider_id: Any, day: date) -> int:
+        backend = cls.backend()
+        key = cls.version_key(provider_id, day)
+        version = backend.get(key)
+
+        if version is None:
+            version = time.time_ns()
+            if not backend.add(key, version, settings.AVAILABILITY_VERSION_TIMEOUT):
+                version = backend.get(key, version)
+
+        return version
+
+    @classmethod
+    async def aversion(cls, provider_id: Any, day: date) -> int:
+        backend = cls.backend()
+        key = cls.version_key(provider_id, day)
+        version = await backend.aget(key)
+
+        if version is None:
+            version = time.time_ns()
+            if not await backend.aadd(
+                key, version, settings.AVAILABILITY_VERSION_TIMEOUT
+            ):
+                version = await backend.aget(key, version)
+
+        return version
+
+    @classmethod
+    def versions(cls, keys: Iterable[Tuple[Any, date]]) -> Dict[Tuple[Any, date], int]:
+        # Three round trips for any number of days. The missing versions are
+        # set without add()'s check: a concurrent request may overwrite one
+        # it just started, which only costs that day a recomputation. Both
+        # then agree on whichever was written last.
+        backend = cls.backend()
+        names = {
+            cls.version_key(provider_id, day): (provider_id, day)
+            for provider_id, day in keys
+        }
+        found = backend.get_many(list(names))
+        missing = [name for name in names if name not in found]
+
+        if missing:
+            version = time.time_ns()
+            backend.set_many(
+                {name: version for name in missing},
+                settings.AVAILABILITY_VERSION_TIMEOUT,
+            )
+            started = backend.get_many(missing)
+            found.update({name: started.get(name, version) for name in missing})
+
+        return {names[name]: version for name, version in found.items()}
+
+    @staticmethod
+    def etag(version: int) -> str:
+        return f'"{version:x}"'
+
+    @classmethod
+    def count(cls, hits: int, misses: int) -> None:
+        with cls._lock:
+            cls._counters["hits"] += hits
+            cls._counters["misses"] += misses
+
+    @classmethod
+    def get(cls, provider_id: Any, day: date, version: int) -> Optional[List[str]]:
+        times = cls.backend().get(cls.key(provider_id, day, version))
+        cls.count(int(times is not None), int(times is None))
+        return times
+
+    @classmethod
+    async def aget(
+        cls, provider_id: Any, day: date, version: int
+    ) -> Optional[List[str]]:
+        times = await cls.backend().aget(cls.key(provider_id, day, version))
+        cls.count(int(times is not None), int(times is None))
+        return times
+
+    @classmethod
+    def get_many(
+        cls, versions: Dict[Tuple[Any, date], int]
+    ) -> Dict[Tuple[Any, date], List[str]]:
+        names = {
+            cls.key(provider_id, day, version): (provider_id, day)
+            for (provider_id, day), version in versions.items()
+        }
+        found = cls.backend().get_many(list(names))
+        cls.count(len(found), len(versions) - len(found))
+        return {names[name]: times for name, times in found.items()}
+
+    @classmethod
+    def set(cls, provider_id: Any, day: date, version: int, times: List[str]) -> None:
+        cls.backend().set(
+            cls.key(provider_id, day, version),
+            times,
+            settings.AVAILABILITY_CACHE_TIMEOUT,
+        )
+
+    @classmethod
+    async def aset(
+        cls, provider_id: Any, day: date, version: int, times: List[str]
+    ) -> None:
+        await cls.backend().aset(
+            cls.key(provider_id, day, version),
+            times,
+            settings.AVAILABILITY_CACHE_TIMEOUT,
+        )
+
+    @classmethod
+    def set_many(
+        cls,
+        entries: Dict[Tuple[Any, date], List[str]],
+        versions: Dict[Tuple[Any, date], int],
+    ) -> None:
+        cls.backend().set_many(
+            {
+                cls.key(provider_id, day, versions[provider_id, day]): times
+                for (provider_id, day), times in entries.items()
+            },
+            settings.AVAILABILITY_CACHE_TIMEOUT,
+        )
+
+    @classmethod
+    def invalidate(cls, provider_id: Any, day: date) -> None:
+        cls.invalidate_many([(provider_id, day)])
+
+    @classmethod
+    def invalidate_many(cls, keys: Iterable[Tuple[Any, date]]) -> None:
+        # Retiring the versions is what invalidates, the slots under them are
+        # dropped too so they don't wait for the timeout.
+        backend = cls.backend()
+        names = {
+            cls.version_key(provider_id, day): (provider_id, day)
+            for provider_id, day in keys
+        }
+        retired = [
+            cls.key(*names[name], version)
+            for name, version in backend.get_many(list(names)).items()
+        ]
+        backend.delete_many(list(names) + retired)
+
+    @classmethod
+    def invalidate_on_commit(cls, keys: Iterable[Tuple[Any, date]]) -> None:
+        # Dropped before commit, a concurrent miss could cache the old slots
+        # again from the rows it still sees.
+        keys = list(keys)
+        transaction.on_commit(lambda: cls.invalidate_many(keys))
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        with cls._lock:
+            return dict(cls._counters)
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        with cls._lock:
+            cls._counters.update(hits=0, misses=0)
@@ -0,0 +1,180 @@
+import random
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from barber_shop.metrics import add_http_time
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf"))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self.state = self.CLOSED
+        self._lock = Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                # Let a single probe through, the others keep failing fast.
+                self.state = self.HALF_OPEN
+                return True
+
+            return self.state == self.CLOSED
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class CalendarMetrics:
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.outcomes = {"success": 0, "failure": 0, "short_circuited": 0}
+            self.latency_count = 0
+            self.latency_sum = 0.0
+            self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, seconds: float) -> None:
+        add_http_time(seconds)
+        with self._lock:
+            self.latency_count += 1
+            self.latency_sum += seconds
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.latency_buckets[index] += 1
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "outcomes": dict(self.outcomes),
+                "latency_count": self.latency_count,
+                "latency_sum": self.latency_sum,
+                "latency_buckets": list(zip(LATENCY_BUCKETS, self.latency_buckets)),
+            }
+
+
+class CalendarClient:
+    # Client for the external holiday calendar (brasilapi). Requests share a
+    # pooled session, have connect/read timeouts and are retried with full
+    # jitter; a circuit breaker stops calling a failing upstream so callers
+    # fall back to the cached calendars right away.
+    _default: Optional["CalendarClient"] = None
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: Tuple[float, float] = (2, 5),
+        retries: int = 2,
+        backoff: float = 0.5,
+        breaker: Optional[CircuitBreaker] = None,
+        pool_size: int = 10,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker(5, 60)
+        self.metrics = CalendarMetrics()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def default(cls) -> "CalendarClient":
+        if cls._default is None:
+            cls._default = cls(
+                settings.HOLIDAYS_API_URL,
+                timeout=(
+                    settings.HOLIDAYS_API_CONNECT_TIMEOUT,
+                    settings.HOLIDAYS_API_READ_TIMEOUT,
+                ),
+                retries=settings.HOLIDAYS_API_RETRIES,
+                backoff=settings.HOLIDAYS_API_BACKOFF,
+                breaker=CircuitBreaker(
+                    settings.HOLIDAYS_API_BREAKER_THRESHOLD,
+                    settings.HOLIDAYS_API_BREAKER_RESET,
+                ),
+            )
+        return cls._default
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, self.backoff * 2**attempt)
+
+    def holidays(self, year: int) -> Optional[List[str]]:
+        if not self.breaker.allow():
+            self.metrics.count("short_circuited")
+            return None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.delay(attempt - 1))
+
+            start = time.perf_counter()
+            try:
+                response = self.session.get(
+                    f"{self.base_url}{year}", timeout=self.timeout
+                )
+            except requests.RequestException:
+                self.metrics.observe(time.perf_counter() - start)
+                continue
+            self.metrics.observe(time.perf_counter() - start)
+
+            if response.status_code == 200:
+                try:
+                    holidays = self.parse(response.json())
+                except (ValueError, KeyError, TypeError):
+                    # A 200 with an unexpected body is an upstream failure.
+                    break
+                return self.success(holidays)
+            if response.status_code not in RETRY_STATUS:
+                break
+
+        return self.failure()
+
+    @staticmethod
+    def parse(holidays: List[Dict]) -> List[str]:
+        return [holiday["date"] for holiday in holidays]
+
+    def success(self, holidays: List[str]) -> List[str]:
+        self.breaker.record_success()
+        self.metrics.count("success")
+        return holidays
+
+    def failure(self) -> None:
+        self.breaker.record_failure()
+        self.metrics.count("failure")
+        return None
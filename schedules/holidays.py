@@ -0,0 +1,157 @@
+import asyncio
+import json
+import time
+from datetime import date, datetime
+from threading import Lock
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from schedules.calendar_client import CalendarClient
+from schedules.models import HolidayCalendar
+
+
+def parse_holidays(values: Iterable[str]) -> FrozenSet[date]:
+    return frozenset(datetime.strptime(value, "%Y-%m-%d").date() for value in values)
+
+
+class HolidayStore:
+    # year -> (holidays, monotonic time the entry was loaded)
+    _years: Dict[int, Tuple[FrozenSet[date], float]] = {}
+    _lock = Lock()
+    # (event loop id, year) -> task loading that year, shared by every
+    # coroutine asking for it while it runs.
+    _inflight: Dict[Tuple[int, int], "asyncio.Task[FrozenSet[date]]"] = {}
+
+    @classmethod
+    def is_holiday(cls, day: date) -> bool:
+        return day in cls.get_year(day.year)
+
+    @classmethod
+    def cached(cls, year: int) -> Optional[FrozenSet[date]]:
+        entry = cls._years.get(year)
+        ttl = settings.HOLIDAYS_MEMORY_TTL.total_seconds()
+
+        if entry and time.monotonic() - entry[1] < ttl:
+            return entry[0]
+
+        return None
+
+    @classmethod
+    def get_year(cls, year: int) -> FrozenSet[date]:
+        holidays = cls.cached(year)
+        if holidays is not None:
+            return holidays
+
+        with cls._lock:
+            holidays = cls.cached(year)
+            if holidays is not None:
+                return holidays
+
+            holidays = cls.load_year(year)
+            cls._years[year] = (holidays, time.monotonic())
+
+        return holidays
+
+    @classmethod
+    def load_year(cls, year: int) -> FrozenSet[date]:
+        # Requests never wait on the calendar API: preload_holidays keeps the
+        # database current and the bundled file covers the rest.
+        holidays = cls.load_from_database(year)
+        if holidays is None:
+            holidays = cls.load_from_file(year)
+
+        return holidays or frozenset()
+
+    @classmethod
+    def load_from_database(cls, year: int) -> Optional[FrozenSet[date]]:
+        calendar = HolidayCalendar.objects.filter(year=year).first()
+
+        if not calendar:
+            return None
+
+        return parse_holidays(calendar.holidays)
+
+    @classmethod
+    def load_from_file(cls, year: int) -> Optional[FrozenSet[date]]:
+        try:
+            with open(settings.HOLIDAYS_FALLBACK_FILE, encoding="utf-8") as file:
+                years = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if str(year) not in years:
+            return None
+
+        return parse_holidays(years[str(year)])
+
+    @classmethod
+    def is_stale(cls, year: int) -> bool:
+        calendar = HolidayCalendar.objects.filter(year=year).first()
+
+        if not calendar:
+            return True
+
+        return timezone.now() - calendar.updated_at >= settings.HOLIDAYS_DATABASE_TTL
+
+    @classmethod
+    def fetch_year(cls, year: int) -> Optional[FrozenSet[date]]:
+        # None when the calendar API is unavailable: callers keep serving the
+        # database or file data.
+        holidays = CalendarClient.default().holidays(year)
+        return None if holidays is None else parse_holidays(holidays)
+
+    @classmethod
+    def preload(cls, year: int, force: bool = False) -> bool:
+        if not force and not cls.is_stale(year):
+            return False
+
+        holidays = cls.fetch_year(year)
+
+        if holidays is None:
+            return False
+
+        HolidayCalendar.objects.update_or_create(
+            year=year,
+            defaults={"holidays": sorted(day.isoformat() for day in holidays)},
+        )
+
+        with cls._lock:
+            cls._years[year] = (holidays, time.monotonic())
+
+        return True
+
+    @classmethod
+    async def ais_holiday(cls, day: date) -> bool:
+        return day in await cls.aget_year(day.year)
+
+    @classmethod
+    async def aget_year(cls, year: int) -> FrozenSet[date]:
+        holidays = cls.cached(year)
+        if holidays is not None:
+            return holidays
+
+        loop = asyncio.get_running_loop()
+        key = (id(loop), year)
+        task = cls._inflight.get(key)
+
+        if task is None:
+            task = loop.create_task(cls._aload_year(year))
+            cls._inflight[key] = task
+            task.add_done_callback(lambda _: cls._inflight.pop(key, None))
+
+        # shield: a cancelled request must not cancel the other waiters.
+        return await asyncio.shield(task)
+
+    @classmethod
+    async def _aload_year(cls, year: int) -> FrozenSet[date]:
+        holidays = await sync_to_async(cls.load_year)(year)
+        cls._years[year] = (holidays, time.monotonic())
+        return holidays
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._years.clear()
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from schedules.holidays import HolidayStore
+
+
+class Command(BaseCommand):
+    help = "Carrega os feriados dos próximos anos na base de dados."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--years",
+            type=int,
+            default=2,
+            help="Quantidade de anos a partir do ano atual.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Atualiza mesmo os anos que ainda estão dentro do TTL.",
+        )
+
+    def handle(self, *args, **options):
+        current_year = timezone.now().year
+
+        for year in range(current_year, current_year + options["years"]):
+            if not options["force"] and not HolidayStore.is_stale(year):
+                self.stdout.write(f"{year}: já atualizado")
+                continue
+
+            if HolidayStore.preload(year, force=True):
+                self.stdout.write(self.style.SUCCESS(f"{year}: carregado"))
+            else:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{year}: API indisponível, mantendo os dados em cache"
+                    )
+                )
@@ -0,0 +1,36 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HolidayCalendar",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "year",
+                    models.PositiveSmallIntegerField(unique=True, verbose_name="Ano"),
+                ),
+                ("holidays", models.JSONField(default=list, verbose_name="Feriados")),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Atualizado em"),
+                ),
+            ],
+        ),
+    ]
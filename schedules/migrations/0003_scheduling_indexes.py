@@ -0,0 +1,31 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0002_holidaycalendar"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="scheduling",
+            index=models.Index(
+                fields=["provider", "date_time"], name="scheduling_provider_dt_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scheduling",
+            index=models.Index(
+                fields=["state", "date_time"], name="scheduling_state_dt_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scheduling",
+            index=models.Index(
+                fields=["client_phone", "date_time"], name="scheduling_phone_dt_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0003_scheduling_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="scheduling",
+            index=models.Index(
+                fields=["provider", "state", "date_time", "id"],
+                name="scheduling_provider_state_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("barbers", "0001_initial"),
+        ("schedules", "0004_scheduling_provider_state_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BusinessHoursException",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Data")),
+                ("closed", models.BooleanField(default=True, verbose_name="Fechado")),
+                (
+                    "opens",
+                    models.TimeField(blank=True, null=True, verbose_name="Abre às"),
+                ),
+                (
+                    "closes",
+                    models.TimeField(blank=True, null=True, verbose_name="Fecha às"),
+                ),
+                (
+                    "reason",
+                    models.CharField(blank=True, max_length=200, verbose_name="Motivo"),
+                ),
+                (
+                    "barber",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="business_hours_exceptions",
+                        to="barbers.barber",
+                        verbose_name="Barbeiro",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="BusinessHours",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "weekday",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Segunda-feira"),
+                            (1, "Terça-feira"),
+                            (2, "Quarta-feira"),
+                            (3, "Quinta-feira"),
+                            (4, "Sexta-feira"),
+                            (5, "Sábado"),
+                            (6, "Domingo"),
+                        ],
+                        verbose_name="Dia da semana",
+                    ),
+                ),
+                ("opens", models.TimeField(verbose_name="Abre às")),
+                ("closes", models.TimeField(verbose_name="Fecha às")),
+                (
+                    "lunch_start",
+                    models.TimeField(
+                        blank=True, null=True, verbose_name="Início do almoço"
+                    ),
+                ),
+                (
+                    "lunch_end",
+                    models.TimeField(
+                        blank=True, null=True, verbose_name="Fim do almoço"
+                    ),
+                ),
+                ("closed", models.BooleanField(default=False, verbose_name="Fechado")),
+                (
+                    "barber",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="business_hours",
+                        to="barbers.barber",
+                        verbose_name="Barbeiro",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="businesshoursexception",
+            constraint=models.UniqueConstraint(
+                fields=("barber", "date"), name="business_hours_exception_barber"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="businesshoursexception",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("barber__isnull", True)),
+                fields=("date",),
+                name="business_hours_exception_shop",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="businesshours",
+            constraint=models.UniqueConstraint(
+                fields=("barber", "weekday"), name="business_hours_barber_weekday"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="businesshours",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("barber__isnull", True)),
+                fields=("weekday",),
+                name="business_hours_shop_weekday",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.1.3 on 2026-10-18 14:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("barbers", "0001_initial"),
+        ("schedules", "0005_business_hours"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProviderDayLock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="Dia")),
+                (
+                    "version",
+                    models.PositiveIntegerField(default=0, verbose_name="Versão"),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="scheduling",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("confirmed", True)),
+                fields=("provider", "date_time"),
+                name="scheduling_confirmed_slot",
+            ),
+        ),
+        migrations.AddField(
+            model_name="providerdaylock",
+            name="provider",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="day_locks",
+                to="barbers.barber",
+                verbose_name="Barbeiro",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="providerdaylock",
+            constraint=models.UniqueConstraint(
+                fields=("provider", "day"), name="provider_day_lock"
+            ),
+        ),
+    ]
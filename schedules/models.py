@@ -1,6 +1,13 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 
 from barbers.models import Barber
+from schedules.cache import AvailabilityCache
 
 
 class Scheduling(models.Model):
@@ -20,6 +27,17 @@ class Scheduling(models.Model):
         ("BP", "Barba e Pintura"),
     )
 
+    # Minutes each work type keeps the barber busy.
+    WORK_DURATIONS = {
+        "ND": 30,
+        "CT": 30,
+        "BB": 30,
+        "PT": 60,
+        "CB": 60,
+        "CP": 90,
+        "BP": 90,
+    }
+
     provider = models.ForeignKey(
         Barber,
         related_name="barber",
@@ -41,5 +59,173 @@ class Scheduling(models.Model):
         verbose_name="Tipo de trabalho", choices=WORK_TYPES, default="ND", max_length=2
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["provider", "date_time"], name="scheduling_provider_dt_idx"
+            ),
+            models.Index(fields=["state", "date_time"], name="scheduling_state_dt_idx"),
+            models.Index(
+                fields=["provider", "state", "date_time", "id"],
+                name="scheduling_provider_state_idx",
+            ),
+            models.Index(
+                fields=["client_phone", "date_time"], name="scheduling_phone_dt_idx"
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "date_time"],
+                condition=models.Q(confirmed=True),
+                name="scheduling_confirmed_slot",
+            ),
+        ]
+
     def __str__(self):
         return self.client_name
+
+
+class BusinessHours(models.Model):
+    WEEKDAYS = (
+        (0, "Segunda-feira"),
+        (1, "Terça-feira"),
+        (2, "Quarta-feira"),
+        (3, "Quinta-feira"),
+        (4, "Sexta-feira"),
+        (5, "Sábado"),
+        (6, "Domingo"),
+    )
+
+    # Rows without a barber are the shop hours, barber rows override them.
+    barber = models.ForeignKey(
+        Barber,
+        related_name="business_hours",
+        on_delete=models.CASCADE,
+        verbose_name="Barbeiro",
+        null=True,
+        blank=True,
+    )
+    weekday = models.PositiveSmallIntegerField(
+        verbose_name="Dia da semana", choices=WEEKDAYS
+    )
+    opens = models.TimeField(verbose_name="Abre às")
+    closes = models.TimeField(verbose_name="Fecha às")
+    lunch_start = models.TimeField(
+        verbose_name="Início do almoço", null=True, blank=True
+    )
+    lunch_end = models.TimeField(verbose_name="Fim do almoço", null=True, blank=True)
+    closed = models.BooleanField(verbose_name="Fechado", default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["barber", "weekday"], name="business_hours_barber_weekday"
+            ),
+            models.UniqueConstraint(
+                fields=["weekday"],
+                condition=models.Q(barber__isnull=True),
+                name="business_hours_shop_weekday",
+            ),
+        ]
+
+    def __str__(self):
+        return self.get_weekday_display()
+
+
+class BusinessHoursException(models.Model):
+    barber = models.ForeignKey(
+        Barber,
+        related_name="business_hours_exceptions",
+        on_delete=models.CASCADE,
+        verbose_name="Barbeiro",
+        null=True,
+        blank=True,
+    )
+    date = models.DateField(verbose_name="Data")
+    closed = models.BooleanField(verbose_name="Fechado", default=True)
+    opens = models.TimeField(verbose_name="Abre às", null=True, blank=True)
+    closes = models.TimeField(verbose_name="Fecha às", null=True, blank=True)
+    reason = models.CharField(verbose_name="Motivo", max_length=200, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["barber", "date"], name="business_hours_exception_barber"
+            ),
+            models.UniqueConstraint(
+                fields=["date"],
+                condition=models.Q(barber__isnull=True),
+                name="business_hours_exception_shop",
+            ),
+        ]
+
+    def __str__(self):
+        return str(self.date)
+
+
+class ProviderDayLock(models.Model):
+    # One row per barber and day. Bookings bump it before checking for
+    # conflicts, so the checks and the insert of a day run one at a time.
+    provider = models.ForeignKey(
+        Barber,
+        related_name="day_locks",
+        on_delete=models.CASCADE,
+        verbose_name="Barbeiro",
+    )
+    day = models.DateField(verbose_name="Dia")
+    version = models.PositiveIntegerField(verbose_name="Versão", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "day"], name="provider_day_lock"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.provider_id} {self.day}"
+
+
+@receiver([post_save, post_delete], sender=Scheduling)
+def invalidate_availability(sender, instance, **kwargs):
+    AvailabilityCache.invalidate_on_commit(
+        [(instance.provider_id, timezone.localdate(instance.date_time))]
+    )
+
+
+class HolidayCalendar(models.Model):
+    year = models.PositiveSmallIntegerField(verbose_name="Ano", unique=True)
+    holidays = models.JSONField(verbose_name="Feriados", default=list)
+    updated_at = models.DateTimeField(verbose_name="Atualizado em", auto_now=True)
+
+    def __str__(self):
+        return str(self.year)
+
+
+@receiver([post_save, post_delete], sender=BusinessHours)
+@receiver([post_save, post_delete], sender=BusinessHoursException)
+def recompile_slot_templates(sender, instance, **kwargs):
+    from schedules.availability import SlotTemplates
+
+    # After commit: reloaded any earlier, the templates could be rebuilt from
+    # the rows this transaction is replacing.
+    transaction.on_commit(SlotTemplates.invalidate)
+
+    if instance.barber_id:
+        provider_ids = [instance.barber_id]
+    else:
+        provider_ids = list(Barber.objects.values_list("id", flat=True))
+
+    if sender is BusinessHoursException:
+        days = [instance.date]
+    else:
+        today = timezone.localdate()
+        days = [
+            today + timedelta(days=offset)
+            for offset in range(settings.AVAILABILITY_CACHE_DAYS)
+            if (today + timedelta(days=offset)).weekday() == instance.weekday
+        ]
+
+    AvailabilityCache.invalidate_on_commit(
+        (provider_id, day) for provider_id in provider_ids for day in days
+    )
@@ -0,0 +1,76 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Optional, Tuple
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class SchedulingCursorPagination(BasePagination):
+    # Keyset pagination on (date_time, id): every page is a bounded range
+    # scan, no matter how deep into the history the client is.
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def encode_cursor(self, row) -> str:
+        # Pages hold model instances or .values() dicts.
+        if isinstance(row, dict):
+            date_time, scheduling_id = row["date_time"], row["id"]
+        else:
+            date_time, scheduling_id = row.date_time, row.id
+
+        value = f"{date_time.isoformat()}|{scheduling_id}"
+        return urlsafe_b64encode(value.encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> Tuple[datetime, int]:
+        try:
+            date_time, scheduling_id = (
+                urlsafe_b64decode(cursor.encode()).decode().split("|")
+            )
+            return datetime.fromisoformat(date_time), int(scheduling_id)
+        except ValueError:
+            raise NotFound("Cursor inválido!")
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return min(max(page_size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by("date_time", "id")
+        cursor = request.query_params.get(self.cursor_query_param)
+
+        if cursor:
+            date_time, scheduling_id = self.decode_cursor(cursor)
+            queryset = queryset.filter(date_time__gte=date_time).filter(
+                Q(date_time__gt=date_time) | Q(id__gt=scheduling_id)
+            )
+
+        rows = list(queryset[: page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = (
+            self.encode_cursor(page[-1]) if len(rows) > page_size else None
+        )
+
+        return page
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.next_cursor:
+            return None
+
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor
+        )
+
+    def get_paginated_response(self, data):
+        return Response(data={"next": self.get_next_link(), "scheduling_list": data})
@@ -1,11 +1,15 @@
 import re
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
 
 from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
 from barbers.models import Barber
 from schedules.models import Scheduling
+from schedules.services import Booking, BookingConflict, SlotConflict
+from schedules.utils import Verifications
 
 
 class SchedulingSerializer(serializers.ModelSerializer):
@@ -20,79 +24,28 @@ class SchedulingSerializer(serializers.ModelSerializer):
             "state",
             "work_type",
         ]
+        # Bookings are confirmed through Booking.confirm, never by writing the
+        # state directly.
+        read_only_fields = ["state"]
 
     provider = serializers.CharField()
     work_type = serializers.CharField()
 
-    def get_hour(self, value, hour, minutes):
-        date = datetime(value.year, value.month, value.day, hour, minutes)
-        return date.strftime("%H:%M")
-
     def validate_provider(self, provider):
+        provider_id = Verifications.parse_uuid(provider)
+
         try:
-            provider_obj = Barber.objects.get(user__first_name=provider)
+            provider_obj = Barber.objects.select_related("user").get(id=provider_id)
         except Barber.DoesNotExist:
             raise serializers.ValidationError("Barbeiro não existe!")
 
         return provider_obj
 
     def validate_date_time(self, date):
-        if date < timezone.now():
-            raise serializers.ValidationError(
-                "O agendamento não pode ser realizado no passado!"
-            )
+        error = SlotConflict.past_error(date)
 
-        if date and datetime.date(date).weekday() == 6:
-            raise serializers.ValidationError(
-                "Infelizmente o barbeiro não trabalha aos domingos!"
-            )
-
-        if date:
-            time = datetime.strftime(date, "%H:%M")
-
-            lunch_time = self.get_hour(date, 12, 0)
-
-            return_interval = self.get_hour(date, 13, 0)
-
-            open_time = self.get_hour(date, 9, 0)
-
-            closing_time = self.get_hour(date, 18, 0)
-
-            if datetime.date(date).weekday() == 5 and time >= return_interval:
-                raise serializers.ValidationError(
-                    "Infelizmente o profissional só trabalha até as 13h no sábado!"
-                )
-            elif (
-                return_interval > time >= lunch_time
-                and datetime.date(date).weekday() != 5
-            ):
-                raise serializers.ValidationError(
-                    "O barbeiro está no horário de almoço!"
-                )
-            elif open_time > time:
-                raise serializers.ValidationError("O barbeiro abre apenas às 9h!")
-            elif closing_time <= time:
-                raise serializers.ValidationError("O barbeiro encerra às 18h!")
-
-        qs = Scheduling.objects.filter(confirmed=True)
-
-        delta = timedelta(minutes=30)
-
-        if qs:
-            for element in qs:
-                date_element = datetime.date(element.date_time)
-                date_request = datetime.date(date)
-
-                if date_element == date_request:
-                    if (
-                        element.date_time + delta <= date
-                        or date + delta <= element.date_time
-                    ):
-                        pass
-                    else:
-                        raise serializers.ValidationError(
-                            "Infelizmente o horário selecionado está indisponível!"
-                        )
+        if error:
+            raise serializers.ValidationError(error)
 
         return date
 
@@ -163,46 +116,60 @@ class SchedulingSerializer(serializers.ModelSerializer):
         return work_type
 
     def validate(self, data):
+        # Only what the request says by itself is checked here, the checks
+        # against other bookings run in Booking.create, under the day lock.
         provider = data.get("provider")
-        client_name = data.get("client_name")
         date_time = data.get("date_time")
         client_phone = data.get("client_phone")
-        state = data.get("state")
-
-        if state:
-            scheduling = Scheduling.objects.filter(
-                client_name=client_name,
-                client_phone=client_phone,
-                state="NCNF",
-                date_time=date_time,
-            ).first()
-            if scheduling:
-                scheduling.state = "CONF"
-                scheduling.confirmed = True
-                scheduling.save()
-                data["state"] = "CONF"
-            else:
-                raise serializers.ValidationError("O horário não pode ser confirmado!")
-
-        if date_time and client_phone:
-            if Scheduling.objects.filter(
-                provider__user__first_name=provider,
-                client_phone=client_phone,
-                date_time__date=date_time,
-            ).exists():
-                raise serializers.ValidationError(
-                    "O(A) cliente não pode ter duas reservas no mesmo dia!"
-                )
-        elif client_name and client_phone and date_time:
-            if Scheduling.objects.filter(
-                provider__user__first_name=provider,
-                date_time=date_time,
-                client_name=client_name,
-                client_phone=client_phone,
-            ).exists():
-                raise serializers.ValidationError(
-                    "O(A) cliente não pode ter duas reservas no mesmo dia!"
-                )
+
+        if provider and date_time:
+            error = SlotConflict.business_hours_error(
+                provider.id, date_time, data.get("work_type")
+            )
+            if error:
+                raise serializers.ValidationError({"date_time": [error]})
+
+        if client_phone.startswith("+") and not client_phone.startswith("+55"):
+            raise serializers.ValidationError(
+                "Deve estar associado a um número do Brasil (+55)"
+            )
+
+        return data
+
+    def create(self, validated_data):
+        try:
+            return Booking.create(validated_data)
+        except BookingConflict as error:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [str(error)]}
+            )
+
+
+class BulkSchedulingSerializer(SchedulingSerializer):
+    # One item of a batch. Barbers come preloaded in the context and the
+    # checks against other bookings run later, on a DaySnapshot.
+    def validate_provider(self, provider):
+        provider_obj = self.context["barbers"].get(Verifications.parse_uuid(provider))
+
+        if not provider_obj:
+            raise serializers.ValidationError("Barbeiro não existe!")
+
+        return provider_obj
+
+    def validate(self, data):
+        date_time = data["date_time"]
+        client_phone = data["client_phone"]
+
+        if Verifications.is_holiday(timezone.localdate(date_time)):
+            raise serializers.ValidationError(
+                "Infelizmente agendamentos não podem ser realizados em feriados!"
+            )
+
+        error = SlotConflict.business_hours_error(
+            data["provider"].id, date_time, data.get("work_type")
+        )
+        if error:
+            raise serializers.ValidationError({"date_time": [error]})
 
         if client_phone.startswith("+") and not client_phone.startswith("+55"):
             raise serializers.ValidationError(
@@ -210,3 +177,51 @@ class SchedulingSerializer(serializers.ModelSerializer):
             )
 
         return data
+
+
+class SchedulingConfirmationSerializer(serializers.Serializer):
+    client_name = serializers.CharField()
+    client_phone = serializers.CharField()
+    date_time = serializers.DateTimeField()
+
+
+class SchedulingRows:
+    # Read-only listing path: builds the same payload as SchedulingSerializer
+    # straight from .values() rows, without per-row field instances.
+    FIELDS = (
+        "id",
+        "provider__user__first_name",
+        "date_time",
+        "client_name",
+        "client_phone",
+        "state",
+        "work_type",
+    )
+
+    WORK_TYPE_LABELS = dict(Scheduling.WORK_TYPES)
+
+    @staticmethod
+    def format_date_time(value: datetime) -> str:
+        value = timezone.localtime(value).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    @staticmethod
+    def from_values(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        labels = SchedulingRows.WORK_TYPE_LABELS
+        format_date_time = SchedulingRows.format_date_time
+
+        return [
+            {
+                "id": row["id"],
+                "provider": row["provider__user__first_name"],
+                "date_time": format_date_time(row["date_time"]),
+                "client_name": row["client_name"],
+                "client_phone": row["client_phone"],
+                "state": row["state"],
+                "work_type": row["work_type"],
+                "work_type_label": labels.get(row["work_type"], row["work_type"]),
+            }
+            for row in rows
+        ]
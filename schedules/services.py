@@ -0,0 +1,389 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from barbers.models import Barber
+from schedules.availability import SLOT_MINUTES, AvailabilityEngine, SlotTemplates
+from schedules.cache import AvailabilityCache
+from schedules.models import ProviderDayLock, Scheduling
+from schedules.utils import DateRange
+
+
+class BookingConflict(Exception):
+    pass
+
+
+class SlotConflict:
+    UNAVAILABLE = "Infelizmente o horário selecionado está indisponível!"
+    SAME_DAY = "O(A) cliente não pode ter duas reservas no mesmo dia!"
+
+    @staticmethod
+    def past_error(date_time: datetime) -> Optional[str]:
+        if date_time < timezone.now():
+            return "O agendamento não pode ser realizado no passado!"
+
+        return None
+
+    @staticmethod
+    def closed_day_error(day: date) -> str:
+        if day.weekday() == 6:
+            return "Infelizmente o barbeiro não trabalha aos domingos!"
+        return "Infelizmente o barbeiro não trabalha neste dia!"
+
+    @staticmethod
+    def format_hour(minute: int) -> str:
+        hours, minutes = divmod(minute, 60)
+        return f"{hours}h{minutes:02d}" if minutes else f"{hours}h"
+
+    @staticmethod
+    def business_hours_error(
+        provider_id: Any, date_time: datetime, work_type: Optional[str] = None
+    ) -> Optional[str]:
+        # Same rule as the listings (AvailabilityEngine.free_mask): a start on
+        # the slot grid whose whole service fits in the working slots.
+        local = timezone.localtime(date_time)
+        weekday = local.weekday()
+        minute = local.hour * 60 + local.minute
+        template = SlotTemplates.for_day(provider_id, local.date())
+        end = minute + Scheduling.WORK_DURATIONS.get(work_type, SLOT_MINUTES)
+        format_hour = SlotConflict.format_hour
+
+        if not template.slots:
+            return SlotConflict.closed_day_error(local.date())
+
+        if minute < template.open_minute:
+            return f"O barbeiro abre apenas às {format_hour(template.open_minute)}!"
+        elif end > template.close_minute:
+            if weekday == 5:
+                return (
+                    "Infelizmente o profissional só trabalha até as "
+                    f"{format_hour(template.close_minute)} no sábado!"
+                )
+            return f"O barbeiro encerra às {format_hour(template.close_minute)}!"
+        elif (
+            (minute - template.open_minute) % SLOT_MINUTES
+            or local.second
+            or local.microsecond
+        ):
+            return f"Os horários são de {SLOT_MINUTES} em {SLOT_MINUTES} minutos!"
+        elif (
+            AvailabilityEngine.interval_mask(template, minute, end - minute)
+            & ~template.mask
+        ):
+            return "O barbeiro está no horário de almoço!"
+
+        return None
+
+    @staticmethod
+    def client_day_error(
+        provider: Barber, client_phone: str, date_time: datetime
+    ) -> Optional[str]:
+        day_start, day_end = DateRange.day_bounds(timezone.localdate(date_time))
+
+        if Scheduling.objects.filter(
+            provider=provider,
+            client_phone=client_phone,
+            date_time__gte=day_start,
+            date_time__lt=day_end,
+        ).exists():
+            return SlotConflict.SAME_DAY
+
+        return None
+
+    @staticmethod
+    def has_conflict(
+        provider: Barber,
+        date_time: datetime,
+        work_type: Optional[str] = None,
+        exclude_id: Optional[int] = None,
+    ) -> bool:
+        # Only bookings starting less than the longest service before the
+        # requested slot can overlap it, so a single bounded range on the
+        # provider's day is enough.
+        minutes = Scheduling.WORK_DURATIONS.get(work_type, SLOT_MINUTES)
+        longest = max(Scheduling.WORK_DURATIONS.values())
+        day_start, day_end = DateRange.day_bounds(timezone.localdate(date_time))
+        qs = Scheduling.objects.filter(
+            provider=provider,
+            confirmed=True,
+            date_time__gte=day_start,
+            date_time__gt=date_time - timedelta(minutes=longest),
+            date_time__lt=min(date_time + timedelta(minutes=minutes), day_end),
+        )
+
+        if exclude_id is not None:
+            qs = qs.exclude(id=exclude_id)
+
+        for start, booked_type in qs.values_list("date_time", "work_type"):
+            booked_minutes = Scheduling.WORK_DURATIONS.get(booked_type, SLOT_MINUTES)
+            if start + timedelta(minutes=booked_minutes) > date_time:
+                return True
+
+        return False
+
+
+class DaySnapshot:
+    # Every booking of some barbers' days, loaded with one query, so a batch
+    # is checked in memory instead of with a few queries per item.
+    def __init__(self, keys: Iterable[Tuple[Any, date]]):
+        keys = set(keys)
+        self.days: Dict[Tuple[Any, date], List[Scheduling]] = {key: [] for key in keys}
+
+        if not keys:
+            return
+
+        window_start = DateRange.day_bounds(min(day for _, day in keys))[0]
+        window_end = DateRange.day_bounds(max(day for _, day in keys))[1]
+        rows = Scheduling.objects.filter(
+            provider__in={provider_id for provider_id, _ in keys},
+            date_time__gte=window_start,
+            date_time__lt=window_end,
+        )
+
+        for scheduling in rows:
+            self.add(scheduling)
+
+    def add(self, scheduling: Scheduling) -> None:
+        key = (scheduling.provider_id, timezone.localdate(scheduling.date_time))
+        if key in self.days:
+            self.days[key].append(scheduling)
+
+    def bookings(self, provider_id: Any, date_time: datetime) -> List[Scheduling]:
+        return self.days.get((provider_id, timezone.localdate(date_time)), [])
+
+    def client_day_error(
+        self, provider_id: Any, client_phone: str, date_time: datetime
+    ) -> Optional[str]:
+        for scheduling in self.bookings(provider_id, date_time):
+            if scheduling.client_phone == client_phone:
+                return SlotConflict.SAME_DAY
+
+        return None
+
+    def has_conflict(
+        self,
+        provider_id: Any,
+        date_time: datetime,
+        work_type: Optional[str] = None,
+        exclude_id: Optional[int] = None,
+    ) -> bool:
+        end = date_time + timedelta(
+            minutes=Scheduling.WORK_DURATIONS.get(work_type, SLOT_MINUTES)
+        )
+
+        for scheduling in self.bookings(provider_id, date_time):
+            if not scheduling.confirmed or scheduling.id == exclude_id:
+                continue
+            booked_end = scheduling.date_time + timedelta(
+                minutes=Scheduling.WORK_DURATIONS.get(
+                    scheduling.work_type, SLOT_MINUTES
+                )
+            )
+            if scheduling.date_time < end and booked_end > date_time:
+                return True
+
+        return False
+
+    def find_pending(
+        self, provider_id: Any, client_name: str, client_phone: str, date_time: datetime
+    ) -> Optional[Scheduling]:
+        for scheduling in self.bookings(provider_id, date_time):
+            if (
+                scheduling.state == "NCNF"
+                and scheduling.date_time == date_time
+                and scheduling.client_name == client_name
+                and scheduling.client_phone == client_phone
+            ):
+                return scheduling
+
+        return None
+
+
+class Booking:
+    # Clients request slots, barbers confirm them. A pending (NCNF) booking
+    # doesn't hold its slot: several clients may request the same one and it
+    # stays listed as free. What the day lock guarantees is one booking per
+    # client and day, and that confirmed bookings never overlap.
+    @staticmethod
+    def lock_days(keys: Iterable[Tuple[Any, date]]) -> None:
+        # Always in the same order, so two batches sharing days can't
+        # deadlock on each other.
+        for provider_id, day in sorted(
+            set(keys), key=lambda key: (str(key[0]), key[1])
+        ):
+            Booking.lock_day(provider_id, day)
+
+    @staticmethod
+    def lock_day(provider_id: Any, day: date) -> None:
+        # An UPDATE takes the row lock (and SQLite's write lock) right away,
+        # unlike SELECT ... FOR UPDATE, which SQLite ignores.
+        lock = ProviderDayLock.objects.filter(provider_id=provider_id, day=day)
+
+        if not lock.update(version=F("version") + 1):
+            # A row we insert is already ours until commit, only one created
+            # by a concurrent request needs the UPDATE.
+            _, created = ProviderDayLock.objects.get_or_create(
+                provider_id=provider_id, day=day
+            )
+            if not created:
+                lock.update(version=F("version") + 1)
+
+    @staticmethod
+    def create(data: Dict[str, Any]) -> Scheduling:
+        # Checked while holding the day lock, so they still hold on insert:
+        # the client has no other booking that day and, for a booking created
+        # confirmed, no confirmed booking overlaps it.
+        provider = data["provider"]
+        date_time = data["date_time"]
+
+        with transaction.atomic():
+            Booking.lock_day(provider.id, timezone.localdate(date_time))
+
+            error = SlotConflict.client_day_error(
+                provider, data["client_phone"], date_time
+            )
+            if not error and SlotConflict.has_conflict(
+                provider, date_time, data.get("work_type")
+            ):
+                error = SlotConflict.UNAVAILABLE
+            if error:
+                raise BookingConflict(error)
+
+            try:
+                with transaction.atomic():
+                    return Scheduling.objects.create(**data)
+            except IntegrityError:
+                raise BookingConflict(SlotConflict.UNAVAILABLE)
+
+    @staticmethod
+    def confirm(
+        provider_id: Any, client_name: str, client_phone: str, date_time: datetime
+    ) -> Optional[Scheduling]:
+        # Under the day lock, like create_many/confirm_many: the pending
+        # booking is confirmed only if no confirmed booking overlaps it. The
+        # UPDATE is conditional, so a retried or concurrent confirmation
+        # changes nothing and gets None back.
+        with transaction.atomic():
+            Booking.lock_day(provider_id, timezone.localdate(date_time))
+
+            scheduling = (
+                Scheduling.objects.filter(
+                    provider_id=provider_id,
+                    client_name=client_name,
+                    client_phone=client_phone,
+                    date_time=date_time,
+                    state="NCNF",
+                )
+                .order_by("id")
+                .first()
+            )
+            if not scheduling:
+                return None
+
+            if SlotConflict.has_conflict(
+                provider_id, date_time, scheduling.work_type, scheduling.id
+            ):
+                raise BookingConflict(SlotConflict.UNAVAILABLE)
+
+            try:
+                with transaction.atomic():
+                    updated = Scheduling.objects.filter(
+                        id=scheduling.id, state="NCNF"
+                    ).update(state="CONF", confirmed=True)
+            except IntegrityError:
+                raise BookingConflict(SlotConflict.UNAVAILABLE)
+
+            if not updated:
+                return None
+
+        scheduling.state = "CONF"
+        scheduling.confirmed = True
+        AvailabilityCache.invalidate_on_commit(
+            [(scheduling.provider_id, timezone.localdate(scheduling.date_time))]
+        )
+        return scheduling
+
+    @staticmethod
+    def create_many(
+        items: List[Dict[str, Any]]
+    ) -> Tuple[List[Scheduling], Dict[int, str]]:
+        # items are validated booking dicts, as SchedulingSerializer returns
+        # them. Returns the created bookings and an error per rejected index.
+        keys = [
+            (item["provider"].id, timezone.localdate(item["date_time"]))
+            for item in items
+        ]
+        accepted = []
+        errors = {}
+
+        with transaction.atomic():
+            Booking.lock_days(keys)
+            snapshot = DaySnapshot(keys)
+
+            for index, item in enumerate(items):
+                provider_id = item["provider"].id
+                error = snapshot.client_day_error(
+                    provider_id, item["client_phone"], item["date_time"]
+                )
+                if not error and snapshot.has_conflict(
+                    provider_id, item["date_time"], item.get("work_type")
+                ):
+                    error = SlotConflict.UNAVAILABLE
+
+                if error:
+                    errors[index] = error
+                    continue
+
+                scheduling = Scheduling(**item)
+                snapshot.add(scheduling)
+                accepted.append(scheduling)
+
+            created = Scheduling.objects.bulk_create(accepted)
+
+        # bulk_create sends no post_save, so the signal can't do this.
+        AvailabilityCache.invalidate_on_commit(set(keys))
+        return created, errors
+
+    @staticmethod
+    def confirm_many(
+        provider: Barber, items: List[Dict[str, Any]]
+    ) -> Tuple[List[Scheduling], Dict[int, str]]:
+        # items hold client_name, client_phone and date_time of pending
+        # bookings of the provider.
+        keys = [(provider.id, timezone.localdate(item["date_time"])) for item in items]
+        confirmed = []
+        errors = {}
+
+        with transaction.atomic():
+            Booking.lock_days(keys)
+            snapshot = DaySnapshot(keys)
+
+            for index, item in enumerate(items):
+                scheduling = snapshot.find_pending(
+                    provider.id,
+                    item["client_name"],
+                    item["client_phone"],
+                    item["date_time"],
+                )
+
+                if not scheduling:
+                    errors[index] = "O horário não pode ser confirmado!"
+                    continue
+                if snapshot.has_conflict(
+                    provider.id, scheduling.date_time, scheduling.work_type
+                ):
+                    errors[index] = SlotConflict.UNAVAILABLE
+                    continue
+
+                scheduling.provider = provider
+                scheduling.state = "CONF"
+                scheduling.confirmed = True
+                confirmed.append(scheduling)
+
+            Scheduling.objects.bulk_update(confirmed, ["state", "confirmed"])
+
+        AvailabilityCache.invalidate_on_commit(set(keys))
+        return confirmed, errors
@@ -3,12 +3,27 @@ from typing import Any, List
 from django.contrib import admin
 from django.urls import path
 
-from schedules.views import ScheduleTime, ScheduleView, healthcheck
+from schedules.views import (
+    AsyncScheduleTime,
+    AsyncScheduleView,
+    ScheduleRangeView,
+    ScheduleTime,
+    ScheduleTimeBulk,
+    ScheduleView,
+    availability_cache_stats,
+    healthcheck,
+)
 
 admin.site.site_header = "Time mapping admin :)!"
 
 urlpatterns: List[Any] = [
     path("v1/", healthcheck, name="healthcheck"),
+    path("v1/schedule-list/", ScheduleRangeView.as_view()),
     path("v1/schedule-list/<str:date>/", ScheduleView.as_view()),
     path("v1/schedule-time/", ScheduleTime.as_view()),
+    path("v1/schedule-time/bulk/", ScheduleTimeBulk.as_view()),
+    path("v1/availability-cache/", availability_cache_stats),
+    # ASGI-native versions of the availability and booking endpoints
+    path("v2/schedule-list/<str:date>/", AsyncScheduleView.as_view()),
+    path("v2/schedule-time/", AsyncScheduleTime.as_view()),
 ]
@@ -1,23 +1,55 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from uuid import UUID
 
-from django.http import JsonResponse
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views import View
 from rest_framework import serializers
 from rest_framework.decorators import api_view
 from rest_framework.generics import ListCreateAPIView
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from barber_shop.renderers import ORJSONResponse
 from barbers.models import Barber
+from schedules.availability import AvailabilityEngine, SlotTemplates
+from schedules.cache import AvailabilityCache
 from schedules.models import Scheduling
-from schedules.serializer import SchedulingSerializer
-from schedules.utils import ListingSchedules, Verifications
+from schedules.serializer import BulkSchedulingSerializer, SchedulingSerializer
+from schedules.services import Booking, SlotConflict
+from schedules.utils import DateRange, Verifications
+
+
+class AvailabilityResponse:
+    # A day's availability only changes through AvailabilityCache
+    # invalidations, so its version is a strong validator: a client or proxy
+    # holding the current ETag gets its 304 before the database is touched.
+    @staticmethod
+    def not_modified(request, etag):
+        response = get_conditional_response(request, etag=etag)
+        return response and AvailabilityResponse.cacheable(response, etag)
+
+    @staticmethod
+    def cacheable(response, etag):
+        response["ETag"] = etag
+        # Browsers revalidate every time, shared caches serve it for a few
+        # seconds and then revalidate too.
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=0,
+            s_maxage=settings.AVAILABILITY_PROXY_MAX_AGE,
+        )
+        return response
 
 
 class ScheduleView(APIView):
     def get(self, request, date):
         date = datetime.strptime(date, "%Y-%m-%d").date()
-        provider = request.query_params.get("provider", None)
-        provider = Barber.objects.filter(user__first_name=provider).first()
+        provider_id = Verifications.parse_uuid(request.query_params.get("provider"))
         appointment_list = []
 
         holiday = Verifications.is_holiday(date)
@@ -27,9 +59,102 @@ class ScheduleView(APIView):
             appointment_list.append(
                 {"Information": "A data selecionada é um feriado!", "status": 150}
             )
-            return JsonResponse(appointment_list, safe=False)
+            return ORJSONResponse(appointment_list, safe=False)
+
+        if not provider_id:
+            return self.provider_not_found()
+
+        template = SlotTemplates.for_day(provider_id, date)
+
+        if not template.slots:
+            # status 160 occurs when the barber doesn't work on the day
+            appointment_list.append(
+                {"Information": SlotConflict.closed_day_error(date), "status": 160}
+            )
+            return ORJSONResponse(appointment_list, safe=False)
+
+        # Read before the slots, which are cached under it: a fill computed
+        # before a write lands under the version that write retires.
+        version = AvailabilityCache.version(provider_id, date)
+        etag = AvailabilityCache.etag(version)
+        not_modified = AvailabilityResponse.not_modified(request, etag)
+        if not_modified:
+            return not_modified
+
+        times = AvailabilityCache.get(provider_id, date, version)
+
+        if times is None:
+            # The cache is shared with every worker, so it is filled from the
+            # primary: a lagging replica would keep serving its stale slots
+            # after the write's invalidation.
+            if not Barber.objects.using("default").filter(id=provider_id).exists():
+                return self.provider_not_found()
+
+            day_start, day_end = DateRange.day_bounds(date)
+            bookings = (
+                Scheduling.objects.using("default")
+                .filter(
+                    provider_id=provider_id,
+                    state="CONF",
+                    confirmed=True,
+                    date_time__gte=day_start,
+                    date_time__lt=day_end,
+                )
+                .values_list("date_time", "work_type")
+            )
+
+            times = AvailabilityEngine.available_times(template, bookings)
+            AvailabilityCache.set(provider_id, date, version, times)
+
+        schedule_list = AvailabilityEngine.as_slots(date, times)
+
+        return AvailabilityResponse.cacheable(
+            ORJSONResponse(schedule_list, safe=False), etag
+        )
+
+    def provider_not_found(self):
+        # status 151 occurs when barber isn't found
+        return Response(
+            {
+                "Information": "Infelizmente nenhum barbeiro foi encontrado, tente novamente!",
+                "status": 151,
+            }
+        )
+
+
+class ScheduleRangeView(APIView):
+    MAX_DAYS = 31
 
-        if not provider:
+    def get(self, request):
+        try:
+            date_from = datetime.strptime(
+                request.query_params.get("from", ""), "%Y-%m-%d"
+            ).date()
+            date_to = datetime.strptime(
+                request.query_params.get("to", ""), "%Y-%m-%d"
+            ).date()
+            provider_ids = [
+                UUID(provider) for provider in request.query_params.getlist("provider")
+            ]
+        except ValueError:
+            return Response(
+                data={"error": "Verifique as datas (AAAA-MM-DD) e os barbeiros!"},
+                status=400,
+            )
+
+        amount_days = (date_to - date_from).days + 1
+        if not 0 < amount_days <= self.MAX_DAYS:
+            return Response(
+                data={"error": f"O intervalo deve ter entre 1 e {self.MAX_DAYS} dias!"},
+                status=400,
+            )
+
+        barbers = Barber.objects.all()
+        if provider_ids:
+            barbers = barbers.filter(id__in=provider_ids)
+        barbers = list(barbers.values_list("id", "user__first_name"))
+
+        if not barbers:
             # status 151 occurs when barber isn't found
             return Response(
                 {
@@ -38,18 +163,155 @@ class ScheduleView(APIView):
                 }
             )
 
-        qs = Scheduling.objects.filter(
-            date_time__date=date, state="CONF", confirmed=True
-        ).order_by("date_time__time")
-        serializer = SchedulingSerializer(qs, many=True)
+        # status 150 marks holidays and 160 days none of the barbers work, as
+        # in ScheduleView. The templates are checked against their shared
+        # version once, not for every barber and day.
+        SlotTemplates.refresh()
+        closed = {}
+        days = []
+        for offset in range(amount_days):
+            day = date_from + timedelta(days=offset)
+            if Verifications.is_holiday(day):
+                closed[day.isoformat()] = 150
+            elif not any(
+                SlotTemplates.lookup(barber_id, day).slots for barber_id, _ in barbers
+            ):
+                closed[day.isoformat()] = 160
+            else:
+                days.append(day)
+
+        keys = [(barber_id, day) for barber_id, _ in barbers for day in days]
+        versions = AvailabilityCache.versions(keys)
+        availability = AvailabilityCache.get_many(versions)
+        missing = [key for key in keys if key not in availability]
 
-        appointment_list = Verifications.verification_weekday(appointment_list, date)
+        if missing:
+            window_start = DateRange.day_bounds(min(day for _, day in missing))[0]
+            window_end = DateRange.day_bounds(max(day for _, day in missing))[1]
+            # From the primary, like the fill of ScheduleView.
+            bookings = (
+                Scheduling.objects.using("default")
+                .filter(
+                    provider__in={barber_id for barber_id, _ in missing},
+                    state="CONF",
+                    confirmed=True,
+                    date_time__gte=window_start,
+                    date_time__lt=window_end,
+                )
+                .values_list("provider_id", "date_time", "work_type")
+            )
 
-        schedule_list = ListingSchedules.remove_scheduling_confirmed(
-            appointment_list, serializer.data
+            computed = AvailabilityEngine.range_availability(missing, bookings)
+            AvailabilityCache.set_many(computed, versions)
+            availability.update(computed)
+
+        return Response(
+            {
+                "from": date_from.isoformat(),
+                "to": date_to.isoformat(),
+                "closed": closed,
+                "providers": [
+                    {
+                        "id": barber_id,
+                        "name": name,
+                        "days": {
+                            day.isoformat(): availability[(barber_id, day)]
+                            for day in days
+                        },
+                    }
+                    for barber_id, name in barbers
+                ],
+            }
         )
 
-        return JsonResponse(schedule_list, safe=False)
+
+class BatchView(APIView):
+    # Base of the bulk endpoints: every item is validated on its own and the
+    # response reports the outcome of each one by its index.
+    permission_classes = [IsAuthenticated]
+    MAX_ITEMS = 100
+
+    def get_items(self):
+        items = self.request.data
+
+        if not isinstance(items, list) or not items:
+            raise serializers.ValidationError("Envie uma lista com os horários!")
+
+        if len(items) > self.MAX_ITEMS:
+            raise serializers.ValidationError(
+                f"Envie no máximo {self.MAX_ITEMS} horários por vez!"
+            )
+
+        return items
+
+    def validate_items(self, items, serializer_class, context=None):
+        item_serializers = [
+            serializer_class(data=item, context=context or {}) for item in items
+        ]
+        for serializer in item_serializers:
+            serializer.is_valid()
+
+        return item_serializers
+
+    def batch_response(self, item_serializers, saved, errors):
+        # errors are keyed by the position among the valid items, saved holds
+        # the remaining valid items in order.
+        valid = [
+            index
+            for index, serializer in enumerate(item_serializers)
+            if not serializer.errors
+        ]
+        accepted = [
+            index for position, index in enumerate(valid) if position not in errors
+        ]
+
+        results = [
+            {"index": index, "errors": serializer.errors}
+            for index, serializer in enumerate(item_serializers)
+            if serializer.errors
+        ]
+        results += [
+            {"index": valid[position], "errors": [error]}
+            for position, error in errors.items()
+        ]
+        results += [
+            {"index": index, "scheduling": SchedulingSerializer(scheduling).data}
+            for index, scheduling in zip(accepted, saved)
+        ]
+        results.sort(key=lambda result: result["index"])
+
+        if not saved:
+            status = 400
+        elif len(saved) < len(item_serializers):
+            status = 207
+        else:
+            status = 201
+
+        return Response(data={"results": results}, status=status)
+
+
+class ScheduleTimeBulk(BatchView):
+    def post(self, request, *args, **kwargs):
+        items = self.get_items()
+        provider_ids = {
+            Verifications.parse_uuid(item.get("provider"))
+            for item in items
+            if isinstance(item, dict)
+        }
+        barbers = Barber.objects.select_related("user").in_bulk(provider_ids - {None})
+
+        item_serializers = self.validate_items(
+            items, BulkSchedulingSerializer, {"barbers": barbers}
+        )
+        created, errors = Booking.create_many(
+            [
+                serializer.validated_data
+                for serializer in item_serializers
+                if not serializer.errors
+            ]
+        )
+
+        return self.batch_response(item_serializers, created, errors)
 
 
 class ScheduleTime(ListCreateAPIView):
@@ -76,6 +338,130 @@ class ScheduleTime(ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
+class AsyncScheduleView(View):
+    # ASGI-native version of ScheduleView: the holiday lookup, the cache and
+    # the ORM calls are awaited instead of holding a worker thread.
+    async def get(self, request, date):
+        date = datetime.strptime(date, "%Y-%m-%d").date()
+        provider_id = Verifications.parse_uuid(request.GET.get("provider"))
+
+        if await Verifications.ais_holiday(date):
+            # status 150 occurs when the date is a holiday.
+            return ORJSONResponse(
+                [{"Information": "A data selecionada é um feriado!", "status": 150}],
+                safe=False,
+            )
+
+        if not provider_id:
+            return self.provider_not_found()
+
+        template = await SlotTemplates.afor_day(provider_id, date)
+
+        if not template.slots:
+            # status 160 occurs when the barber doesn't work on the day
+            return ORJSONResponse(
+                [{"Information": SlotConflict.closed_day_error(date), "status": 160}],
+                safe=False,
+            )
+
+        # Read before the slots, as in ScheduleView.
+        version = await AvailabilityCache.aversion(provider_id, date)
+        etag = AvailabilityCache.etag(version)
+        not_modified = AvailabilityResponse.not_modified(request, etag)
+        if not_modified:
+            return not_modified
+
+        times = await AvailabilityCache.aget(provider_id, date, version)
+
+        if times is None:
+            # From the primary, like the fill of ScheduleView.
+            if (
+                not await Barber.objects.using("default")
+                .filter(id=provider_id)
+                .aexists()
+            ):
+                return self.provider_not_found()
+
+            day_start, day_end = DateRange.day_bounds(date)
+            bookings = [
+                booking
+                async for booking in Scheduling.objects.using("default")
+                .filter(
+                    provider_id=provider_id,
+                    state="CONF",
+                    confirmed=True,
+                    date_time__gte=day_start,
+                    date_time__lt=day_end,
+                )
+                .values_list("date_time", "work_type")
+            ]
+
+            times = AvailabilityEngine.available_times(template, bookings)
+            await AvailabilityCache.aset(provider_id, date, version, times)
+
+        return AvailabilityResponse.cacheable(
+            ORJSONResponse(AvailabilityEngine.as_slots(date, times), safe=False), etag
+        )
+
+    def provider_not_found(self):
+        # status 151 occurs when barber isn't found
+        return ORJSONResponse(
+            {
+                "Information": "Infelizmente nenhum barbeiro foi encontrado, tente novamente!",
+                "status": 151,
+            }
+        )
+
+
+class AsyncScheduleTime(View):
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Same as DRF's APIView: the API is token based, not session based.
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            data = orjson.loads(request.body or b"{}")
+            date = datetime.strptime(data.get("date_time", "")[:10], "%Y-%m-%d").date()
+        except (ValueError, AttributeError):
+            return ORJSONResponse(
+                {"date_time": ["Informe a data no formato AAAA-MM-DDTHH:MM!"]},
+                status=400,
+            )
+
+        if await Verifications.ais_holiday(date):
+            return ORJSONResponse(
+                ["Infelizmente agendamentos não podem ser realizados em feriados!"],
+                status=400,
+                safe=False,
+            )
+
+        # The serializer validation runs several queries of its own, so it
+        # goes to the thread pool as a single unit.
+        return await sync_to_async(self.create)(data)
+
+    def create(self, data):
+        serializer = SchedulingSerializer(data=data)
+
+        if not serializer.is_valid():
+            return ORJSONResponse(serializer.errors, status=400)
+
+        try:
+            serializer.save()
+        except serializers.ValidationError as error:
+            return ORJSONResponse(error.detail, status=400, safe=False)
+
+        return ORJSONResponse(serializer.data, status=201)
+
+
 @api_view(http_method_names=["GET"])
 def healthcheck(request):
     return Response({"status": "OK"}, status=200)
+
+
+@api_view(http_method_names=["GET"])
+def availability_cache_stats(request):
+    # Counters of the worker process answering the request.
+    return Response(AvailabilityCache.stats(), status=200)